@@ -0,0 +1,263 @@
+"""aPLib compressor and decompressor for SGDK tile data.
+
+Produces the raw aPLib stream (no header) that SGDK unpacks with
+``aplib_unpack`` / ``COMPRESSION_APLIB``. The encoder is a greedy
+hash-chain matcher that picks, per position, the cheapest of the
+format's literal, single-byte, short, long and repeat-offset codes.
+"""
+
+# How many earlier positions with the same two-byte prefix are tried
+MAX_CHAIN = 128
+# Cap on a single match length
+MAX_MATCH = 0xFFFF
+
+
+def _gamma_bits(value):
+    """Number of bits the Elias-gamma style code for value occupies."""
+    return 2 * (value.bit_length() - 1)
+
+
+def _long_match_length_field(offset, length):
+    """Length field of a long (gamma) match, or 0 if it cannot be encoded."""
+    if offset >= 32000:
+        length -= 1
+    if offset >= 1280:
+        length -= 1
+    if offset < 128:
+        length -= 2
+    return length if length >= 2 else 0
+
+
+class _BitWriter:
+    """Output buffer with tag bits interleaved the way aPLib reads them."""
+
+    def __init__(self):
+        self.out = bytearray()
+        self._tag_pos = 0
+        self._bits_left = 0
+
+    def bit(self, value):
+        if not self._bits_left:
+            # Reserve the next tag byte where the decoder will fetch it
+            self._tag_pos = len(self.out)
+            self.out.append(0)
+            self._bits_left = 8
+        self._bits_left -= 1
+        if value:
+            self.out[self._tag_pos] |= 1 << self._bits_left
+
+    def byte(self, value):
+        self.out.append(value)
+
+    def gamma(self, value):
+        for shift in range(value.bit_length() - 2, -1, -1):
+            self.bit((value >> shift) & 1)
+            self.bit(1 if shift else 0)
+
+
+def _match_length(data, candidate, pos, limit):
+    """Length of the common run starting at candidate and pos."""
+    length = 0
+    while length < limit and data[candidate + length] == data[pos + length]:
+        length += 1
+    return length
+
+
+def compress(data):
+    """Compress bytes into a raw aPLib stream.
+
+    Args:
+        data (bytes): Uncompressed data
+
+    Returns:
+        bytes: Compressed stream, terminated by the aPLib end marker
+    """
+    data = bytes(data)
+    size = len(data)
+    if not size:
+        return b""
+
+    writer = _BitWriter()
+    writer.byte(data[0])
+
+    chains = {}
+    last_offset = 0
+    after_match = False
+
+    def insert(position):
+        if position + 1 < size:
+            chains.setdefault(data[position:position + 2], []).append(position)
+
+    insert(0)
+    pos = 1
+    while pos < size:
+        limit = min(MAX_MATCH, size - pos)
+
+        # Longest earlier match, preferring the nearest on ties
+        best_length = 0
+        best_offset = 0
+        chain = chains.get(data[pos:pos + 2]) if limit >= 2 else None
+        if chain:
+            for candidate in reversed(chain[-MAX_CHAIN:]):
+                length = _match_length(data, candidate, pos, limit)
+                if length > best_length:
+                    best_length = length
+                    best_offset = pos - candidate
+                    if length == limit:
+                        break
+
+        # Each option is (bits saved versus literals, length, kind, offset)
+        options = [(0, 1, "literal", 0)]
+
+        if not after_match and last_offset and last_offset <= pos:
+            length = _match_length(data, pos - last_offset, pos, limit)
+            if length >= 2:
+                cost = 4 + _gamma_bits(length)
+                options.append((9 * length - cost, length, "repeat", last_offset))
+
+        if best_length >= 2:
+            if best_offset < 128:
+                length = min(best_length, 3)
+                options.append((9 * length - 11, length, "short", best_offset))
+            length_field = _long_match_length_field(best_offset, best_length)
+            if length_field:
+                high = (best_offset >> 8) + (2 if after_match else 3)
+                cost = 2 + _gamma_bits(high) + 8 + _gamma_bits(length_field)
+                options.append((9 * best_length - cost, best_length, "long",
+                                best_offset))
+
+        if data[pos] == 0:
+            options.append((2, 1, "single", 0))
+        else:
+            for offset in range(1, min(15, pos) + 1):
+                if data[pos - offset] == data[pos]:
+                    options.append((2, 1, "single", offset))
+                    break
+
+        _, length, kind, offset = max(options, key=lambda o: (o[0], o[1]))
+
+        if kind == "literal":
+            writer.bit(0)
+            writer.byte(data[pos])
+            after_match = False
+        elif kind == "single":
+            for bit in (1, 1, 1):
+                writer.bit(bit)
+            for shift in (3, 2, 1, 0):
+                writer.bit((offset >> shift) & 1)
+            after_match = False
+        elif kind == "short":
+            for bit in (1, 1, 0):
+                writer.bit(bit)
+            writer.byte((offset << 1) | (length - 2))
+            last_offset = offset
+            after_match = True
+        elif kind == "repeat":
+            writer.bit(1)
+            writer.bit(0)
+            writer.gamma(2)
+            writer.gamma(length)
+            after_match = True
+        else:
+            writer.bit(1)
+            writer.bit(0)
+            writer.gamma((offset >> 8) + (2 if after_match else 3))
+            writer.byte(offset & 0xFF)
+            writer.gamma(_long_match_length_field(offset, length))
+            last_offset = offset
+            after_match = True
+
+        for position in range(pos, pos + length):
+            insert(position)
+        pos += length
+
+    # End marker: short match with offset 0
+    for bit in (1, 1, 0):
+        writer.bit(bit)
+    writer.byte(0)
+
+    return bytes(writer.out)
+
+
+def decompress(data):
+    """Decompress a raw aPLib stream.
+
+    Args:
+        data (bytes): Compressed stream
+
+    Returns:
+        bytes: Uncompressed data
+    """
+    if not data:
+        return b""
+
+    src = 1
+    out = bytearray(data[:1])
+    tag = 0
+    bits_left = 0
+    last_offset = 0
+    after_match = False
+
+    def getbit():
+        nonlocal src, tag, bits_left
+        if not bits_left:
+            tag = data[src]
+            src += 1
+            bits_left = 8
+        bits_left -= 1
+        return (tag >> bits_left) & 1
+
+    def getgamma():
+        value = 1
+        while True:
+            value = (value << 1) | getbit()
+            if not getbit():
+                return value
+
+    def copy(offset, length):
+        start = len(out) - offset
+        if offset >= length:
+            out.extend(out[start:start + length])
+        else:
+            for i in range(length):
+                out.append(out[start + i])
+
+    while True:
+        if not getbit():
+            out.append(data[src])
+            src += 1
+            after_match = False
+        elif not getbit():
+            high = getgamma()
+            if not after_match and high == 2:
+                copy(last_offset, getgamma())
+            else:
+                offset = ((high - (2 if after_match else 3)) << 8) | data[src]
+                src += 1
+                length = getgamma()
+                if offset >= 32000:
+                    length += 1
+                if offset >= 1280:
+                    length += 1
+                if offset < 128:
+                    length += 2
+                copy(offset, length)
+                last_offset = offset
+            after_match = True
+        elif not getbit():
+            value = data[src]
+            src += 1
+            offset = value >> 1
+            if not offset:
+                break
+            copy(offset, 2 + (value & 1))
+            last_offset = offset
+            after_match = True
+        else:
+            offset = 0
+            for _ in range(4):
+                offset = (offset << 1) | getbit()
+            out.append(out[-offset] if offset else 0)
+            after_match = False
+
+    return bytes(out)
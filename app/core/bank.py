@@ -0,0 +1,231 @@
+"""Multi-character sprite banks sharing one tile set and palette."""
+
+import io
+import os
+import time
+from .csource import CSourceWriter, c_name
+from .exporter import LAYOUT_TILES, SPRITE_BLOCK, pack_sprite_frames
+from .palette_alloc import allocate_palettes, md_word, snap_character
+from .spec import CharacterSpec
+from .tileset import TILE_ATTR_PALETTE_SHIFT, TILE_BYTES, TileSet
+from .workers import map_in_workers, pool_size, worker_exporter
+
+
+def c_identifier(name):
+    """Turn a character name into an upper-case C identifier fragment."""
+    return c_name(name).upper()
+
+
+def _render_tiles(job):
+    """Render one character with its line's palette as tile-ordered frames."""
+    character_data, palette = job
+    frame_count = character_data.get("animation_frames", 1)
+    generator = worker_exporter().generator
+    frames = [generator.generate_indexed(character_data, palette, frame)
+              for frame in range(frame_count)]
+    return pack_sprite_frames(frames, LAYOUT_TILES)
+
+
+def _validated(characters):
+    """Return characters as CharacterSpecs, checking their names.
+
+    Raises:
+        ValueError: If there are no characters, or naming the first
+            invalid or repeated character
+    """
+    if not characters:
+        # Every bank array would be zero-length, which C does not allow
+        raise ValueError("bank needs at least one character")
+    validated = []
+    seen = {}
+    for character_name, character_data in characters:
+        identifier = c_identifier(character_name)
+        if identifier in seen:
+            raise ValueError(f"Character '{character_name}': duplicate name "
+                             f"{identifier} (already used by "
+                             f"'{seen[identifier]}')")
+        seen[identifier] = character_name
+        try:
+            spec = CharacterSpec.from_dict(character_data)
+        except ValueError as e:
+            raise ValueError(f"Character '{character_name}': {e}") from None
+        validated.append((character_name, spec))
+    return validated
+
+
+class BankExporter:
+    """Exports many characters as one bank of shared tiles and palettes.
+
+    The bank holds one deduplicated tile set, up to four palette lines
+    shared between characters (colours snapped to the Mega Drive's
+    9-bit colour space) and offset tables into a single map array. Map
+    entries are full tile attribute words, palette line included, so a
+    frame is drawn by copying its map slice into VRAM tables.
+    """
+
+    def __init__(self, workers=None):
+        """Create a bank exporter.
+
+        Args:
+            workers (int): Worker processes used for rendering
+                (default: CPU count)
+        """
+        self.workers = workers
+
+    def export_bank(self, characters, output_path):
+        """Export a bank to a .c file and its header.
+
+        Args:
+            characters (list): ``(name, character_data)`` tuples
+            output_path (str): Output file path (.c file)
+
+        Returns:
+            dict: Bank statistics
+        """
+        base_name = os.path.splitext(os.path.basename(output_path))[0]
+        output_dir = os.path.dirname(output_path)
+
+        files = self.export_to_memory(characters, base_name)
+
+        with open(output_path, 'w') as f:
+            f.write(files["c_file"])
+        with open(os.path.join(output_dir, base_name + ".h"), 'w') as f:
+            f.write(files["h_file"])
+
+        return files["stats"]
+
+    def export_to_memory(self, characters, name):
+        """Build a bank without touching the filesystem.
+
+        Every character is validated as a CharacterSpec first, and each
+        needs a name that stays unique as a C identifier. A bank needs
+        at least one character.
+
+        Args:
+            characters (list): ``(name, character_data)`` tuples
+            name (str): Base name used for C identifiers
+
+        Returns:
+            dict: ``c_file`` and ``h_file`` source text and ``stats``
+
+        Raises:
+            ValueError: If there are no characters, a character is
+                invalid, names collide or the characters do not fit the
+                bank
+        """
+        started = time.perf_counter()
+        characters = _validated(characters)
+        allocation = allocate_palettes([data for _, data in characters])
+        assignments = allocation.assignments
+        palettes = allocation.palettes()
+
+        # Rendering with snapped colours makes every part colour an exact
+        # entry of its line
+        jobs = [(snap_character(data), palettes[line])
+                for (_, data), line in zip(characters, assignments)]
+        rendered = self._render(jobs)
+
+        # Tiles are added in input order so the bank is deterministic
+        tileset = TileSet()
+        maps = []
+        map_offsets = []
+        first_frames = []
+        for frames, line in zip(rendered, assignments):
+            first_frames.append(len(map_offsets))
+            palette_bits = line << TILE_ATTR_PALETTE_SHIFT
+            for frame_data in frames:
+                map_offsets.append(len(maps))
+                maps.extend(attr | palette_bits
+                            for attr in tileset.add_frame(frame_data))
+        if len(map_offsets) > 0xFFFF:
+            raise ValueError(f"Bank has {len(map_offsets)} frames; frame "
+                             "indices are u16, so at most 65535 fit")
+
+        # CRAM words from the snapped 3-bit levels of every entry
+        palette_data = [md_word(color) for palette in palettes
+                        for color in palette]
+        tiles_w = [(data.get("size", 32) + 7) // 8 for _, data in characters]
+        frame_counts = [len(frames) for frames in rendered]
+
+        c_buffer = io.StringIO()
+        out = CSourceWriter(c_buffer)
+        out.include(f"{name}.h")
+        out.u16_array(f"const u16 {name}_palette[{len(palette_data)}]",
+                      palette_data, 8)
+        tile_data = tileset.data()
+        out.u8_array(f"const u8 {name}_tiles[{len(tile_data)}]", tile_data, 16)
+        out.u16_array(f"const u16 {name}_maps[{len(maps)}]", maps, 8)
+        # The map outgrows 16-bit offsets long before the tile set fills up
+        out.u32_array(f"const u32 {name}_map_offset[{len(map_offsets)}]",
+                      map_offsets, 8)
+        out.u16_array(f"const u16 {name}_first_frame[{len(characters)}]",
+                      first_frames, 8)
+        out.u8_array(f"const u8 {name}_frame_count[{len(characters)}]",
+                     frame_counts, 16)
+        out.u8_array(f"const u8 {name}_tiles_w[{len(characters)}]",
+                     tiles_w, 16)
+        out.u8_array(f"const u8 {name}_palette_line[{len(characters)}]",
+                     assignments, 16)
+
+        h_buffer = io.StringIO()
+        self._write_header_file(h_buffer, name, characters, len(palettes),
+                                len(tileset), len(maps), len(map_offsets))
+
+        stats = tileset.stats()
+        stats.update({
+            "characters": len(characters),
+            "frames": len(map_offsets),
+            "palette_lines": len(palettes),
+            "palette_report": allocation.report(
+                [character_name for character_name, _ in characters]),
+            "data_bytes": len(tile_data),
+            "elapsed": time.perf_counter() - started,
+        })
+        return {
+            "c_file": c_buffer.getvalue(),
+            "h_file": h_buffer.getvalue(),
+            "stats": stats,
+        }
+
+    def _render(self, jobs):
+        """Render every job in the worker pool, keeping input order."""
+        if not jobs:
+            return []
+        return list(map_in_workers(_render_tiles, jobs,
+                                   pool_size(self.workers, len(jobs))))
+
+    def _write_header_file(self, f, name, characters, line_count, tile_count,
+                           map_length, frame_total):
+        """Write the bank header to a text stream."""
+        guard = f"{name.upper()}_H"
+        count = len(characters)
+        lines = [
+            f"#ifndef {guard}\n",
+            f"#define {guard}\n\n",
+            "#include <genesis.h>\n\n",
+            f"extern const u16 {name}_palette[{line_count * 16}];\n",
+            f"extern const u8 {name}_tiles[{tile_count * TILE_BYTES}];\n",
+            f"extern const u16 {name}_maps[{map_length}];\n",
+            f"extern const u32 {name}_map_offset[{frame_total}];\n",
+            f"extern const u16 {name}_first_frame[{count}];\n",
+            f"extern const u8 {name}_frame_count[{count}];\n",
+            f"extern const u8 {name}_tiles_w[{count}];\n",
+            f"extern const u8 {name}_palette_line[{count}];\n",
+            "\n",
+            f"#define {name.upper()}_CHARACTER_COUNT {count}\n",
+            f"#define {name.upper()}_FRAME_COUNT {frame_total}\n",
+            f"#define {name.upper()}_TILE_COUNT {tile_count}\n",
+            f"#define {name.upper()}_PALETTE_LINES {line_count}\n",
+            "\n",
+        ]
+        if any(data.get("size", 32) > SPRITE_BLOCK for _, data in characters):
+            lines.append(f"// Frames over {SPRITE_BLOCK} pixels are split "
+                         f"into {SPRITE_BLOCK}x{SPRITE_BLOCK} sprites, left "
+                         "to right\n// then top to bottom; each sprite's map "
+                         "entries are column-major\n\n")
+        # Character indices into the per-character tables
+        lines.extend(f"#define {name.upper()}_{c_identifier(character_name)} "
+                     f"{index}\n"
+                     for index, (character_name, _) in enumerate(characters))
+        lines.append(f"\n#endif // {guard}\n")
+        f.write("".join(lines))
@@ -0,0 +1,165 @@
+"""Batch export of many characters using a process pool."""
+
+import json
+import os
+import time
+from .csource import c_name
+from .spec import CharacterSpec
+from .workers import map_in_workers, pool_size, worker_exporter
+
+
+def load_specs(source):
+    """Load character specifications from a directory or a JSONL file.
+
+    A directory is scanned for ``*.json`` files, one character each,
+    named after the file. In a JSONL file every non-empty line is one
+    character. A ``name`` field always takes precedence.
+
+    A file or line that is not a JSON object is reported as a failure
+    instead of aborting the load, so one bad entry does not cost the
+    rest of the batch.
+
+    Args:
+        source (str): Directory or ``.jsonl`` file path
+
+    Returns:
+        tuple: ``(name, character_data)`` tuples of the loaded
+        characters, and ``(name, error)`` tuples of the entries that
+        could not be loaded
+    """
+    specs = []
+    failures = []
+
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if not filename.endswith(".json"):
+                continue
+            default_name = os.path.splitext(filename)[0]
+            try:
+                with open(os.path.join(source, filename), 'r') as f:
+                    data = _parse_spec(f.read())
+            except (OSError, ValueError) as e:
+                failures.append((default_name, f"{type(e).__name__}: {e}"))
+                continue
+            specs.append((data.get("name", default_name), data))
+    else:
+        with open(source, 'r') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                default_name = f"character_{line_no}"
+                try:
+                    data = _parse_spec(line)
+                except ValueError as e:
+                    failures.append((default_name,
+                                     f"{type(e).__name__}: {e}"))
+                    continue
+                specs.append((data.get("name", default_name), data))
+
+    return specs, failures
+
+
+def _parse_spec(text):
+    """Parse one character's JSON, which must be an object."""
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Character data must be an object")
+    return data
+
+
+def output_names(specs):
+    """Assign every character a unique, sanitised output name.
+
+    Names become C identifiers (see csource.c_name), which also keeps
+    the files they name inside the output directory. Names are compared
+    case-insensitively, as on the file systems most exports end up on;
+    every repeat of a name is rejected rather than overwriting the first.
+
+    Args:
+        specs (list): ``(name, character_data)`` tuples
+
+    Returns:
+        tuple: ``(name, output_name, character_data)`` tuples, and
+        ``(name, error)`` tuples of the rejected duplicates
+    """
+    named = []
+    failures = []
+    seen = {}
+    for name, character_data in specs:
+        output_name = c_name(name)
+        key = output_name.lower()
+        if key in seen:
+            failures.append((name, f"ValueError: Duplicate name "
+                                   f"'{output_name}' (already used by "
+                                   f"'{seen[key]}')"))
+            continue
+        seen[key] = name
+        named.append((name, output_name, character_data))
+    return named, failures
+
+
+def _export_one(job):
+    """Export a single character, returning errors instead of raising."""
+    name, output_name, character_data, output_dir, options = job
+    started = time.perf_counter()
+    try:
+        worker_exporter().export_character(
+            CharacterSpec.from_dict(character_data),
+            os.path.join(output_dir, output_name + ".c"), **options)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    return name, error, time.perf_counter() - started
+
+
+def export_batch(specs, output_dir, workers=None, progress=None,
+                 load_failures=(), **options):
+    """Export many characters in parallel.
+
+    Each character is exported independently; a failure is recorded in
+    the summary and does not stop the rest of the batch. Files are named
+    by output_names(), so names cannot escape ``output_dir`` and a
+    repeated name fails instead of overwriting another character.
+
+    Args:
+        specs (list): ``(name, character_data)`` tuples
+        output_dir (str): Directory the files are written to
+        workers (int): Worker process count (default: CPU count)
+        progress (callable): Called as ``progress(done, total, name, error)``
+            after each character
+        load_failures (list): ``(name, error)`` tuples from load_specs,
+            counted as failed characters
+        **options: Keyword arguments for SGDKExporter.export_character
+
+    Returns:
+        dict: Counts, failures, elapsed seconds and characters per second
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    named, duplicates = output_names(specs)
+    failures = list(load_failures) + duplicates
+    total = len(failures) + len(named)
+
+    jobs = [(name, output_name, data, output_dir, options)
+            for name, output_name, data in named]
+    workers = pool_size(workers, len(jobs))
+    started = time.perf_counter()
+
+    results = map_in_workers(_export_one, jobs, workers)
+    for done, (name, error, _) in enumerate(results, 1):
+        if error:
+            failures.append((name, error))
+        if progress:
+            progress(done, len(jobs), name, error)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "total": total,
+        "exported": total - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+        "elapsed": elapsed,
+        "per_second": len(jobs) / elapsed if elapsed else 0.0,
+        "workers": workers,
+    }
@@ -0,0 +1,90 @@
+"""Bulk C source formatting for the SGDK exporter."""
+
+import re
+
+# Hex literal for every byte value, so formatting data is a table lookup
+HEX_U8 = tuple(f"0x{value:02X}" for value in range(256))
+_HEX_DIGITS = tuple(f"{value:02X}" for value in range(256))
+
+
+def hex_u8(values):
+    """Return ``0xNN`` literals for an iterable of byte values."""
+    return list(map(HEX_U8.__getitem__, values))
+
+
+def hex_u16(values):
+    """Return ``0xNNNN`` literals for an iterable of 16-bit values."""
+    digits = _HEX_DIGITS
+    return ["0x" + digits[value >> 8] + digits[value & 0xFF]
+            for value in values]
+
+
+def hex_u32(values):
+    """Return ``0xNNNNNNNN`` literals for an iterable of 32-bit values."""
+    return [f"0x{value:08X}" for value in values]
+
+
+def c_name(name):
+    """Turn an arbitrary name into a valid C identifier.
+
+    Anything but ASCII letters, digits and underscores becomes an
+    underscore, so the result is also a safe file name.
+    """
+    identifier = re.sub(r"[^0-9A-Za-z_]", "_", str(name)) or "_"
+    return "_" + identifier if identifier[0].isdigit() else identifier
+
+
+def format_array(declaration, literals, per_row):
+    """Format a C array definition from preformatted literals.
+
+    Rows hold ``per_row`` literals; every row but the last ends in
+    ``", "`` before the newline.
+
+    Args:
+        declaration (str): Text before ``= {``, e.g. ``const u8 x[4]``
+        literals (list): Element literals
+        per_row (int): Elements per line
+
+    Returns:
+        str: The complete definition followed by a blank line
+    """
+    rows = [", ".join(literals[i:i + per_row])
+            for i in range(0, len(literals), per_row)]
+    body = "    " + ", \n    ".join(rows) if rows else ""
+    if literals and len(literals) % per_row == 0:
+        body += "\n"
+    return f"{declaration} = {{\n{body}\n}};\n\n"
+
+
+class CSourceWriter:
+    """Writes C source to a text stream, one write per definition."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        """Write raw source text."""
+        self.stream.write(text)
+
+    def include(self, header):
+        """Write an ``#include "header"`` line and a blank line."""
+        self.stream.write(f'#include "{header}"\n\n')
+
+    def u8_array(self, declaration, data, per_row=16):
+        """Write a byte array from bytes or an iterable of ints."""
+        self.stream.write(format_array(declaration, hex_u8(data), per_row))
+
+    def u16_array(self, declaration, values, per_row=8):
+        """Write a 16-bit array from an iterable of ints."""
+        self.stream.write(format_array(declaration, hex_u16(values), per_row))
+
+    def u32_array(self, declaration, values, per_row=8):
+        """Write a 32-bit array from an iterable of ints."""
+        self.stream.write(format_array(declaration, hex_u32(values), per_row))
+
+    def pointer_array(self, declaration, entries):
+        """Write an array of identifiers, one per line."""
+        body = "".join(f"    {entry},\n" for entry in entries[:-1])
+        if entries:
+            body += f"    {entries[-1]}\n"
+        self.stream.write(f"{declaration} = {{\n{body}}};\n\n")
@@ -1,63 +1,552 @@
 """SGDK exporter for character sprites."""
 
+import io
 import os
+import struct
 from PIL import Image
-from .generator import CharacterGenerator
+from . import aplib
+from .csource import CSourceWriter
+from .generator import CharacterGenerator, ROLE_COLOR_FIELDS, ROLE_OUTLINE
+from .metrics import metrics
+from .palette import get_palette
+from .tileset import TileSet
+
+
+# Sprite data layouts: plain row-major pixels across the whole sprite, or
+# 8x8 tiles in the column-major order Mega Drive sprites are read in.
+LAYOUT_LINEAR = "linear"
+LAYOUT_TILES = "tiles"
+
+# Largest Mega Drive hardware sprite (4x4 tiles) in pixels; bigger frames
+# are split into blocks of this size in the tiles layout
+SPRITE_BLOCK = 32
+
+# Optional compression of sprite/tile data, named after SGDK's constants
+COMPRESSION_NONE = None
+COMPRESSION_APLIB = "aplib"
+
+_COMPRESSORS = {
+    COMPRESSION_APLIB: (aplib.compress, "COMPRESSION_APLIB"),
+}
+
+# Output formats: C arrays of hex literals, or raw big-endian .bin files
+# plus an SGDK rescomp .res descriptor that includes them as BIN resources
+OUTPUT_C = "c"
+OUTPUT_BINARY = "binary"
+
+# Byte translation tables that move a palette index into the high or low
+# nibble, so a whole frame can be packed without a per-pixel Python loop.
+_HIGH_NIBBLE = bytes((i & 0x0F) << 4 for i in range(256))
+_LOW_NIBBLE = bytes(i & 0x0F for i in range(256))
+
+# Palette index of every role code in variant frames: the parts keep
+# their own entries, outlines use black entry 0 as in export_to_memory
+_VARIANT_INDICES = bytes(0 if i == ROLE_OUTLINE else i for i in range(256))
+
+
+def pack_4bpp(pixels):
+    """Pack 8-bit palette indices into 4bpp, two pixels per byte.
+    
+    This is the Mega Drive's pixel format, used for sprite data and for
+    the packed preview encoding. The first pixel of each pair goes into
+    the high nibble, indices are masked to their low four bits, and an
+    odd trailing pixel is paired with index 0. Pixels are packed in the
+    order given; pack_sprite_frames handles tile ordering.
+    
+    Args:
+        pixels (bytes): One palette index per pixel
+        
+    Returns:
+        bytes: Packed pixel data
+    """
+    high = pixels[0::2].translate(_HIGH_NIBBLE)
+    low = pixels[1::2].translate(_LOW_NIBBLE)
+    if len(low) < len(high):
+        low += b"\x00"
+    # OR the two nibble planes together as big integers in one C-level pass
+    packed = int.from_bytes(high, "big") | int.from_bytes(low, "big")
+    return packed.to_bytes(len(high), "big")
+
+
+def _tile_order(frame):
+    """Return the pixels of an indexed frame as 8x8 tiles.
+    
+    The frame is padded with index 0 up to a multiple of 8 in both
+    directions. A Mega Drive sprite is at most 4x4 tiles, so the frame
+    is cut into SPRITE_BLOCK sized blocks, left to right then top to
+    bottom, and each block's tiles are ordered column by column, top to
+    bottom, as the hardware expects. Frames of up to 32 pixels are a
+    single block.
+    
+    Args:
+        frame (PIL.Image): Indexed ("P") frame
+        
+    Returns:
+        bytes: One palette index per pixel, 64 per tile
+    """
+    width, height = frame.size
+    padded_w = (width + 7) // 8 * 8
+    padded_h = (height + 7) // 8 * 8
+    if (padded_w, padded_h) != (width, height):
+        # Cropping past the edges fills the new area with index 0
+        frame = frame.crop((0, 0, padded_w, padded_h))
+    
+    # An 8 pixel wide column strip of a block in row-major order is
+    # exactly that column's tiles stacked top to bottom
+    return b"".join(
+        frame.crop((x, top, x + 8, min(top + SPRITE_BLOCK, padded_h))).tobytes()
+        for top in range(0, padded_h, SPRITE_BLOCK)
+        for left in range(0, padded_w, SPRITE_BLOCK)
+        for x in range(left, min(left + SPRITE_BLOCK, padded_w), 8))
+
+
+def sprite_blocks(size):
+    """Return how many hardware sprites a frame spans across and down.
+    
+    Args:
+        size (int): Frame width and height in pixels
+        
+    Returns:
+        int: Number of SPRITE_BLOCK sized blocks along each axis
+    """
+    return (size + SPRITE_BLOCK - 1) // SPRITE_BLOCK
+
+
+def pack_sprite_frames(frames, layout=LAYOUT_LINEAR):
+    """Convert indexed frames to 4bpp sprite data.
+    
+    With LAYOUT_TILES each frame is padded to whole tiles and emitted
+    as 32-byte 8x8 tiles, split into 32x32 sprite blocks that are each
+    in column-major order (see _tile_order).
+    
+    Args:
+        frames (list): Indexed ("P") frames
+        layout (str): LAYOUT_LINEAR or LAYOUT_TILES
+        
+    Returns:
+        list: One ``bytes`` object of 4bpp pixel data per frame
+    """
+    if layout == LAYOUT_LINEAR:
+        return [pack_4bpp(frame.tobytes()) for frame in frames]
+    if layout == LAYOUT_TILES:
+        return [pack_4bpp(_tile_order(frame)) for frame in frames]
+    raise ValueError(f"Unknown sprite data layout: {layout}")
+
+
+def _pack_u16(values):
+    """Pack 16-bit words big-endian, the Mega Drive's byte order."""
+    return struct.pack(f">{len(values)}H", *values)
 
 
 class SGDKExporter:
     """Exports character sprites to SGDK format."""
     
-    def __init__(self):
+    def __init__(self, indexed_rendering=True, exact_cram=False):
+        """Create an exporter.
+        
+        Args:
+            indexed_rendering (bool): Draw frames directly in palette
+                indices instead of rendering RGBA and quantizing
+            exact_cram (bool): Encode palettes from the top 3 bits of
+                each channel, as bank exports do, instead of the legacy
+                words that spill into neighbouring bits (see Palette)
+        """
         self.generator = CharacterGenerator()
+        self.indexed_rendering = indexed_rendering
+        self.exact_cram = exact_cram
     
-    def export_character(self, character_data, output_path):
+    def export_character(self, character_data, output_path, layout=LAYOUT_LINEAR,
+                         dedupe_tiles=False, compression=COMPRESSION_NONE,
+                         output_format=OUTPUT_C):
         """Export character to SGDK format.
         
         Args:
             character_data (dict): Character specification
-            output_path (str): Output file path (.c file)
+            output_path (str): Output file path (.c file; with
+                OUTPUT_BINARY only its directory and base name are used)
+            layout (str): LAYOUT_LINEAR or LAYOUT_TILES
+            dedupe_tiles (bool): Emit a shared tile set and per-frame maps
+            compression (str): COMPRESSION_NONE or COMPRESSION_APLIB
+            output_format (str): OUTPUT_C or OUTPUT_BINARY
         """
         base_name = os.path.splitext(os.path.basename(output_path))[0]
         output_dir = os.path.dirname(output_path)
         
-        # Generate all animation frames
-        frames = []
+        files = self.export_to_memory(character_data, base_name, layout,
+                                      dedupe_tiles, compression, output_format)
+        
+        with metrics.timer("exporter.write_files"):
+            if output_format == OUTPUT_BINARY:
+                # rescomp generates the header from the .res descriptor
+                res_path = os.path.join(output_dir, base_name + ".res")
+                with open(res_path, 'w') as f:
+                    f.write(files["res_file"])
+                for file_name, data in files["bin_files"].items():
+                    with open(os.path.join(output_dir, file_name), 'wb') as f:
+                        f.write(data)
+            else:
+                # Write C file
+                with open(output_path, 'w') as f:
+                    f.write(files["c_file"])
+                
+                # Write header file
+                header_path = os.path.join(output_dir, base_name + ".h")
+                with open(header_path, 'w') as f:
+                    f.write(files["h_file"])
+            
+            # Save PNG reference
+            if files["png_file"]:
+                png_path = os.path.join(output_dir, base_name + ".png")
+                with open(png_path, 'wb') as f:
+                    f.write(files["png_file"])
+    
+    def export_to_memory(self, character_data, name, layout=LAYOUT_LINEAR,
+                         dedupe_tiles=False, compression=COMPRESSION_NONE,
+                         output_format=OUTPUT_C):
+        """Export character to SGDK format without touching the filesystem.
+        
+        With ``dedupe_tiles`` the frames are cut into 8x8 tiles (the
+        layout argument is ignored), identical and flipped tiles are
+        stored once, and each frame becomes a map of tile attribute words.
+        
+        With ``compression`` every data array (each frame, or the shared
+        tile set) is compressed and must be unpacked before use; the
+        header names the SGDK compression constant to unpack with.
+        
+        With OUTPUT_BINARY no C source is produced: every array becomes a
+        big-endian ``.bin`` file and ``res_file`` lists them as rescomp
+        BIN resources named like the C arrays. rescomp declares BIN
+        resources as byte arrays, so palettes and maps are ``u8`` data
+        to read as big-endian words, and no SpriteDefinition
+        (``{name}_frameN``) or ``{name}_animation`` is emitted; game
+        code written against the C output needs adapting.
+        
+        Args:
+            character_data (dict): Character specification
+            name (str): Base name used for C identifiers and file names
+            layout (str): LAYOUT_LINEAR or LAYOUT_TILES
+            dedupe_tiles (bool): Emit a shared tile set and per-frame maps
+            compression (str): COMPRESSION_NONE or COMPRESSION_APLIB
+            output_format (str): OUTPUT_C or OUTPUT_BINARY
+            
+        Returns:
+            dict: ``c_file`` and ``h_file`` source text, ``res_file``
+            descriptor text and ``bin_files`` (file name to bytes) for
+            binary output, ``png_file`` sprite sheet bytes (empty when
+            there are no frames) and ``stats`` with output sizes and
+            compression ratio
+        """
+        if output_format not in (OUTPUT_C, OUTPUT_BINARY):
+            raise ValueError(f"Unknown output format: {output_format}")
+        
         frame_count = character_data.get("animation_frames", 1)
         size = character_data.get("size", 32)
         
+        with metrics.timer("exporter.render"):
+            palette, indexed_frames = self._render_indexed_frames(character_data)
+        
+        # Generate palette data
+        palette_data = self._generate_palette_data(palette)
+        
+        if dedupe_tiles:
+            c_buffer = io.StringIO()
+            h_buffer = io.StringIO()
+            res_buffer = io.StringIO()
+            bin_files = {}
+            
+            with metrics.timer("exporter.sprite_data"):
+                sprite_data = self._generate_sprite_data(indexed_frames, size,
+                                                         LAYOUT_TILES)
+            with metrics.timer("exporter.tileset"):
+                tileset = TileSet()
+                frame_maps = [tileset.add_frame(frame_data)
+                              for frame_data in sprite_data]
+                tile_data = tileset.data()
+            stats = tileset.stats()
+            if compression:
+                packed_data = self._compress(tile_data, compression)
+                stats.update(self._size_stats([tile_data], [packed_data]))
+                tile_data = packed_data
+            else:
+                stats.update(self._size_stats([tile_data]))
+            
+            if output_format == OUTPUT_BINARY:
+                with metrics.timer("exporter.binary"):
+                    resources = [(f"{name}_tiles", tile_data)]
+                    resources += [(f"{name}_frame{i}_map", _pack_u16(frame_map))
+                                  for i, frame_map in enumerate(frame_maps)]
+                    bin_files = self._write_resources(
+                        res_buffer, name, palette_data, resources, compression)
+            else:
+                with metrics.timer("exporter.c_source"):
+                    self._write_tileset_c_file(c_buffer, name, tile_data,
+                                               frame_maps, palette_data)
+                with metrics.timer("exporter.header"):
+                    self._write_tileset_header_file(h_buffer, name, size,
+                                                    frame_count, len(tileset),
+                                                    compression)
+            
+            files = {
+                "c_file": c_buffer.getvalue(),
+                "h_file": h_buffer.getvalue(),
+                "res_file": res_buffer.getvalue(),
+                "bin_files": bin_files,
+                "stats": stats,
+            }
+        else:
+            # Generate sprite data
+            with metrics.timer("exporter.sprite_data"):
+                sprite_data = self._generate_sprite_data(indexed_frames, size,
+                                                         layout)
+            files = self._sprite_files(name, sprite_data, palette_data, size,
+                                       frame_count, layout, compression,
+                                       output_format)
+        
+        # PNG reference
+        png_buffer = io.BytesIO()
+        with metrics.timer("exporter.png"):
+            self._save_sprite_sheet(indexed_frames, png_buffer, size)
+        files["png_file"] = png_buffer.getvalue()
+        
+        return files
+    
+    def export_variants(self, character_data, variants, name,
+                        layout=LAYOUT_LINEAR, compression=COMPRESSION_NONE,
+                        output_format=OUTPUT_C):
+        """Export colour variants of a character sharing one set of tiles.
+        
+        The frames are rendered once in role codes, which are also the
+        indices of the parts in the exporter's palette, so every variant
+        reuses the packed sprite data and only adds a 16-entry palette.
+        ``{name}_palette`` is the palette of ``character_data`` itself and
+        ``{name}_variant_palettes`` holds one palette per variant.
+        
+        Outlines use index 0, as in export_to_memory, so the frame data
+        matches it pixel for pixel unless a part is black. Parts always
+        keep their own palette entry here, since a variant may recolour
+        them: a part coloured black stays opaque (with its outline
+        drawn), where export_to_memory maps it to the transparent
+        index 0.
+        
+        Args:
+            character_data (dict): Character specification
+            variants (list): Dicts overriding any of ``head_color``,
+                ``body_color``, ``arm_color`` and ``leg_color``
+            name (str): Base name used for C identifiers and file names
+            layout (str): LAYOUT_LINEAR or LAYOUT_TILES
+            compression (str): COMPRESSION_NONE or COMPRESSION_APLIB
+            output_format (str): OUTPUT_C or OUTPUT_BINARY
+            
+        Returns:
+            dict: The same keys as export_to_memory; ``stats`` also
+            counts the variants and their palette bytes
+            
+        Raises:
+            ValueError: If a variant changes anything besides colours
+        """
+        if output_format not in (OUTPUT_C, OUTPUT_BINARY):
+            raise ValueError(f"Unknown output format: {output_format}")
+        for variant in variants:
+            unknown = set(variant) - set(ROLE_COLOR_FIELDS)
+            if unknown:
+                raise ValueError("Variants can only change colours, not "
+                                 + ", ".join(sorted(unknown)))
+        
+        frame_count = character_data.get("animation_frames", 1)
+        size = character_data.get("size", 32)
+        palette = self._create_megadrive_palette(character_data)
+        
+        with metrics.timer("exporter.render"):
+            frames = []
+            for frame in range(frame_count):
+                roles = self.generator.generate_roles(character_data, frame)
+                image = Image.frombytes(
+                    "P", roles.size,
+                    roles.tobytes().translate(_VARIANT_INDICES))
+                image.putpalette(palette.flat)
+                frames.append(image)
+        
+        with metrics.timer("exporter.sprite_data"):
+            sprite_data = self._generate_sprite_data(frames, size, layout)
+        
+        palette_data = self._generate_palette_data(palette)
+        with metrics.timer("exporter.variant_palettes"):
+            variant_data = []
+            for variant in variants:
+                variant_palette = self._create_megadrive_palette(
+                    {**character_data, **variant})
+                variant_data.extend(
+                    self._generate_palette_data(variant_palette))
+        
+        files = self._sprite_files(name, sprite_data, palette_data, size,
+                                   frame_count, layout, compression,
+                                   output_format, variant_data)
+        files["stats"]["variants"] = len(variants)
+        files["stats"]["palette_bytes"] = 2 * (len(palette_data)
+                                               + len(variant_data))
+        
+        png_buffer = io.BytesIO()
+        with metrics.timer("exporter.png"):
+            self._save_sprite_sheet(frames, png_buffer, size)
+        files["png_file"] = png_buffer.getvalue()
+        
+        return files
+    
+    def _sprite_files(self, name, sprite_data, palette_data, size,
+                      frame_count, layout, compression, output_format,
+                      variant_data=()):
+        """Compress packed frames and assemble their output files.
+        
+        Shared by export_to_memory and export_variants, so both handle
+        compression, binary resources and C source the same way.
+        
+        Args:
+            name (str): Base name used for C identifiers and file names
+            sprite_data (list): Packed 4bpp data of each frame
+            palette_data (list): Mega Drive words of the palette
+            size (int): Frame width and height in pixels
+            frame_count (int): Number of animation frames
+            layout (str): Layout the frames were packed in
+            compression (str): COMPRESSION_NONE or COMPRESSION_APLIB
+            output_format (str): OUTPUT_C or OUTPUT_BINARY
+            variant_data (list): Words of extra 16-colour palettes,
+                emitted as ``{name}_variant_palettes``
+            
+        Returns:
+            dict: ``c_file``, ``h_file``, ``res_file``, ``bin_files``
+            and ``stats``, as in export_to_memory
+        """
+        if compression:
+            packed_data = [self._compress(data, compression)
+                           for data in sprite_data]
+            stats = self._size_stats(sprite_data, packed_data)
+            sprite_data = packed_data
+        else:
+            stats = self._size_stats(sprite_data)
+        
+        c_buffer = io.StringIO()
+        h_buffer = io.StringIO()
+        res_buffer = io.StringIO()
+        bin_files = {}
+        
+        if output_format == OUTPUT_BINARY:
+            with metrics.timer("exporter.binary"):
+                resources = [(f"{name}_frame{i}_data", frame_data)
+                             for i, frame_data in enumerate(sprite_data)]
+                if variant_data:
+                    resources.append((f"{name}_variant_palettes",
+                                      _pack_u16(variant_data)))
+                bin_files = self._write_resources(
+                    res_buffer, name, palette_data, resources, compression)
+        else:
+            with metrics.timer("exporter.c_source"):
+                self._write_c_file(c_buffer, name, sprite_data, palette_data,
+                                   size, frame_count)
+                if variant_data:
+                    CSourceWriter(c_buffer).u16_array(
+                        f"const u16 {name}_variant_palettes"
+                        f"[{len(variant_data)}]", variant_data, 8)
+            with metrics.timer("exporter.header"):
+                self._write_header_file(h_buffer, name, size, frame_count,
+                                        compression, len(variant_data) // 16,
+                                        layout)
+        
+        return {
+            "c_file": c_buffer.getvalue(),
+            "h_file": h_buffer.getvalue(),
+            "res_file": res_buffer.getvalue(),
+            "bin_files": bin_files,
+            "stats": stats,
+        }
+    
+    def build_tileset(self, characters, tileset=None):
+        """Deduplicate the tiles of several characters into one tile set.
+        
+        Tiles are compared by palette index, so sharing only pays off for
+        characters whose palettes line up.
+        
+        Args:
+            characters (list): Character specifications
+            tileset (TileSet): Existing tile set to extend
+            
+        Returns:
+            tuple: The tile set and, per character, a list of frame maps
+        """
+        if tileset is None:
+            tileset = TileSet()
+        
+        character_maps = []
+        for character_data in characters:
+            size = character_data.get("size", 32)
+            _, indexed_frames = self._render_indexed_frames(character_data)
+            sprite_data = self._generate_sprite_data(indexed_frames, size,
+                                                     LAYOUT_TILES)
+            character_maps.append([tileset.add_frame(frame_data)
+                                   for frame_data in sprite_data])
+        
+        return tileset, character_maps
+    
+    def _compress(self, data, compression):
+        """Compress one data array with the named compressor."""
+        if compression not in _COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+        compressor, _ = _COMPRESSORS[compression]
+        with metrics.timer("exporter.compress"):
+            return compressor(data)
+    
+    def _size_stats(self, arrays, packed_arrays=None):
+        """Measure raw data size and, if given, the compressed size.
+        
+        Returns:
+            dict: ``data_bytes``, plus ``compressed_bytes`` and
+            ``compression_ratio`` (compressed / raw) for packed arrays
+        """
+        raw_bytes = sum(len(data) for data in arrays)
+        stats = {"data_bytes": raw_bytes}
+        if packed_arrays is not None:
+            packed_bytes = sum(len(data) for data in packed_arrays)
+            stats["compressed_bytes"] = packed_bytes
+            stats["compression_ratio"] = (packed_bytes / raw_bytes
+                                          if raw_bytes else 1.0)
+        return stats
+    
+    def _render_indexed_frames(self, character_data):
+        """Render every animation frame and convert it to palette indices.
+        
+        Returns:
+            tuple: The 16-colour palette and the list of indexed frames
+        """
+        frame_count = character_data.get("animation_frames", 1)
+        palette = self._create_megadrive_palette(character_data)
+        
+        if self.indexed_rendering:
+            indexed_frames = [
+                self.generator.generate_indexed(character_data, palette, frame)
+                for frame in range(frame_count)]
+            return palette, indexed_frames
+        
+        # Generate all animation frames
+        frames = []
+        
         for frame in range(frame_count):
             sprite = self.generator.generate_character(character_data, frame)
             frames.append(sprite)
         
         # Convert to indexed color (Mega Drive palette)
         indexed_frames = []
-        palette = self._create_megadrive_palette(character_data)
         
         for frame in frames:
             indexed_frame = self._convert_to_indexed(frame, palette)
             indexed_frames.append(indexed_frame)
         
-        # Generate sprite data
-        sprite_data = self._generate_sprite_data(indexed_frames, size)
-        
-        # Generate palette data
-        palette_data = self._generate_palette_data(palette)
-        
-        # Write C file
-        self._write_c_file(output_path, base_name, sprite_data, palette_data, 
-                          size, frame_count)
-        
-        # Write header file
-        header_path = os.path.join(output_dir, base_name + ".h")
-        self._write_header_file(header_path, base_name, size, frame_count)
-        
-        # Save PNG reference
-        png_path = os.path.join(output_dir, base_name + ".png")
-        self._save_sprite_sheet(indexed_frames, png_path, size)
+        return palette, indexed_frames
     
     def _create_megadrive_palette(self, character_data):
-        """Create a Mega Drive compatible palette."""
+        """Create a Mega Drive compatible palette.
+        
+        Returns:
+            Palette: Shared immutable 16-colour palette
+        """
         # Extract colors from character data
         colors = [
             "#000000",  # Black (transparent)
@@ -74,7 +563,7 @@ class SGDKExporter:
         while len(colors) < 16:
             colors.append("#000000")
         
-        return colors[:16]
+        return get_palette(colors[:16])
     
     def _convert_to_indexed(self, image, palette):
         """Convert RGBA image to indexed color using the given palette."""
@@ -82,141 +571,205 @@ class SGDKExporter:
         rgb_image = Image.new("RGB", image.size, (0, 0, 0))
         rgb_image.paste(image, mask=image.split()[-1])  # Use alpha as mask
         
-        # Create palette image
-        palette_image = Image.new("P", (1, 1))
-        palette_colors = []
-        for color in palette:
-            r = int(color[1:3], 16)
-            g = int(color[3:5], 16)
-            b = int(color[5:7], 16)
-            palette_colors.extend([r, g, b])
+        # Quantize to the palette's prebuilt palette image
+        quantized = rgb_image.quantize(palette=get_palette(palette).image)
         
-        # Pad palette to 768 bytes (256 colors * 3 components)
-        while len(palette_colors) < 768:
-            palette_colors.append(0)
+        return quantized
+    
+    def _generate_sprite_data(self, frames, size, layout=LAYOUT_LINEAR):
+        """Generate sprite data in SGDK format (see pack_sprite_frames)."""
+        return pack_sprite_frames(frames, layout)
+    
+    def _generate_palette_data(self, palette):
+        """Generate palette data in SGDK format."""
+        # Mega Drive color format: 0000BBB0GGG0RRR0
+        palette = get_palette(palette)
+        if self.exact_cram:
+            return list(palette.cram_words)
+        return list(palette.md_words)
+    
+    def _write_c_file(self, f, name, sprite_data, palette_data, 
+                     size, frame_count):
+        """Write the C source to a text stream."""
+        out = CSourceWriter(f)
+        out.include(f"{name}.h")
         
-        palette_image.putpalette(palette_colors)
+        # Write palette data
+        out.u16_array(f"const u16 {name}_palette[16]", palette_data, 8)
         
-        # Quantize to palette
-        quantized = rgb_image.quantize(palette=palette_image)
+        # Write sprite data for each frame
+        for frame_idx, frame_data in enumerate(sprite_data):
+            out.u8_array(
+                f"const u8 {name}_frame{frame_idx}_data[{len(frame_data)}]",
+                frame_data, 16)
         
-        return quantized
+        # Write sprite definitions
+        tiles_w = (size + 7) // 8  # Round up to nearest tile
+        tiles_h = (size + 7) // 8
+        out.write("".join(
+            f"const SpriteDefinition {name}_frame{frame_idx} = {{\n"
+            f"    .w = {tiles_w},\n"
+            f"    .h = {tiles_h},\n"
+            f"    .tiles = {name}_frame{frame_idx}_data,\n"
+            f"    .palette = {name}_palette,\n"
+            f"    .numTile = {tiles_w * tiles_h}\n"
+            "};\n\n"
+            for frame_idx in range(frame_count)))
+        
+        # Write animation array
+        if frame_count > 1:
+            out.pointer_array(
+                f"const SpriteDefinition* {name}_animation[{frame_count}]",
+                [f"&{name}_frame{i}" for i in range(frame_count)])
     
-    def _generate_sprite_data(self, frames, size):
-        """Generate sprite data in SGDK format."""
-        sprite_data = []
+    def _write_header_file(self, f, name, size, frame_count,
+                           compression=COMPRESSION_NONE, variant_count=0,
+                           layout=LAYOUT_LINEAR):
+        """Write the header to a text stream.
         
-        for frame_idx, frame in enumerate(frames):
-            frame_data = []
-            
-            # Convert to 4bpp (4 bits per pixel) format
-            pixels = list(frame.getdata())
-            
-            # Group pixels in pairs (2 pixels per byte)
-            for i in range(0, len(pixels), 2):
-                pixel1 = pixels[i] & 0x0F
-                pixel2 = pixels[i + 1] & 0x0F if i + 1 < len(pixels) else 0
-                byte_value = (pixel1 << 4) | pixel2
-                frame_data.append(byte_value)
-            
-            sprite_data.append(frame_data)
+        With ``variant_count`` the variant palettes are declared too.
+        """
+        guard = f"{name.upper()}_H"
+        f.write(f"#ifndef {guard}\n")
+        f.write(f"#define {guard}\n\n")
+        f.write("#include <genesis.h>\n\n")
+        
+        # Declarations
+        f.write(f"extern const u16 {name}_palette[16];\n")
         
-        return sprite_data
+        for frame_idx in range(frame_count):
+            f.write(f"extern const u8 {name}_frame{frame_idx}_data[];\n")
+            f.write(f"extern const SpriteDefinition {name}_frame{frame_idx};\n")
+        
+        if frame_count > 1:
+            f.write(f"extern const SpriteDefinition* {name}_animation[{frame_count}];\n")
+        
+        if variant_count:
+            f.write(f"extern const u16 {name}_variant_palettes[{variant_count * 16}];\n")
+        
+        f.write(f"\n#define {name.upper()}_FRAME_COUNT {frame_count}\n")
+        f.write(f"#define {name.upper()}_SIZE {size}\n")
+        if variant_count:
+            f.write(f"#define {name.upper()}_VARIANT_COUNT {variant_count}\n")
+        if layout == LAYOUT_TILES:
+            self._write_sprite_blocks(f, name, size)
+        self._write_compression_define(f, name, compression)
+        
+        f.write(f"\n#endif // {guard}\n")
     
-    def _generate_palette_data(self, palette):
-        """Generate palette data in SGDK format."""
-        palette_data = []
+    def _write_sprite_blocks(self, f, name, size):
+        """Describe how tile-ordered frames split into hardware sprites.
+        
+        Only frames larger than one SPRITE_BLOCK need describing.
+        """
+        if size <= SPRITE_BLOCK:
+            return
+        blocks = sprite_blocks(size)
+        f.write(f"\n// Frames are split into {blocks}x{blocks} sprites of up to "
+                f"{SPRITE_BLOCK}x{SPRITE_BLOCK} pixels,\n"
+                "// left to right then top to bottom; each sprite's tiles "
+                "are column-major\n")
+        f.write(f"#define {name.upper()}_SPRITES_W {blocks}\n")
+        f.write(f"#define {name.upper()}_SPRITES_H {blocks}\n")
+    
+    def _write_compression_define(self, f, name, compression):
+        """Declare which SGDK compression the data arrays use, if any."""
+        if compression:
+            _, sgdk_constant = _COMPRESSORS[compression]
+            f.write(f"#define {name.upper()}_COMPRESSION {sgdk_constant}\n")
+    
+    def _write_resources(self, f, name, palette_data, resources, compression):
+        """Write a rescomp descriptor for raw binary resources.
+        
+        The palette is stored as 16 big-endian words. Data that is
+        already compressed is included as-is (rescomp compression NONE)
+        and the descriptor notes which SGDK constant unpacks it. Every
+        resource is a byte array to rescomp, whatever its word size.
         
-        for color in palette:
-            # Convert to Mega Drive RGB format (4 bits per component)
-            r = int(color[1:3], 16) >> 4
-            g = int(color[3:5], 16) >> 4
-            b = int(color[5:7], 16) >> 4
+        Args:
+            f: Text stream for the ``.res`` descriptor
+            name (str): Base name of the character
+            palette_data (list): Mega Drive palette words
+            resources (list): ``(identifier, bytes)`` data arrays
+            compression (str): Compression applied to the data arrays
             
-            # Mega Drive color format: 0000BBB0GGG0RRR0
-            md_color = (b << 9) | (g << 5) | (r << 1)
-            palette_data.append(md_color)
+        Returns:
+            dict: ``.bin`` file name to file contents
+        """
+        lines = [f"// {name}: SGDK rescomp resources\n"]
+        if compression:
+            _, sgdk_constant = _COMPRESSORS[compression]
+            lines.append(f"// Sprite data is packed; unpack with "
+                         f"{sgdk_constant}\n")
+        lines.append("\n")
         
-        return palette_data
+        bin_files = {}
+        resources = [(f"{name}_palette", _pack_u16(palette_data))] + resources
+        for identifier, data in resources:
+            file_name = identifier + ".bin"
+            bin_files[file_name] = bytes(data)
+            lines.append(f'BIN {identifier} "{file_name}" 2 2 0 NONE FALSE\n')
+        f.write("".join(lines))
+        return bin_files
     
-    def _write_c_file(self, output_path, name, sprite_data, palette_data, 
-                     size, frame_count):
-        """Write the C source file."""
-        with open(output_path, 'w') as f:
-            f.write(f'#include "{name}.h"\n\n')
-            
-            # Write palette data
-            f.write(f"const u16 {name}_palette[16] = {{\n")
-            for i, color in enumerate(palette_data):
-                if i % 8 == 0:
-                    f.write("    ")
-                f.write(f"0x{color:04X}")
-                if i < len(palette_data) - 1:
-                    f.write(", ")
-                if i % 8 == 7:
-                    f.write("\n")
-            f.write("\n};\n\n")
-            
-            # Write sprite data for each frame
-            for frame_idx, frame_data in enumerate(sprite_data):
-                f.write(f"const u8 {name}_frame{frame_idx}_data[{len(frame_data)}] = {{\n")
-                for i, byte in enumerate(frame_data):
-                    if i % 16 == 0:
-                        f.write("    ")
-                    f.write(f"0x{byte:02X}")
-                    if i < len(frame_data) - 1:
-                        f.write(", ")
-                    if i % 16 == 15:
-                        f.write("\n")
-                f.write("\n};\n\n")
-            
-            # Write sprite definitions
-            for frame_idx in range(frame_count):
-                tiles_w = (size + 7) // 8  # Round up to nearest tile
-                tiles_h = (size + 7) // 8
-                f.write(f"const SpriteDefinition {name}_frame{frame_idx} = {{\n")
-                f.write(f"    .w = {tiles_w},\n")
-                f.write(f"    .h = {tiles_h},\n")
-                f.write(f"    .tiles = {name}_frame{frame_idx}_data,\n")
-                f.write(f"    .palette = {name}_palette,\n")
-                f.write(f"    .numTile = {tiles_w * tiles_h}\n")
-                f.write("};\n\n")
-            
-            # Write animation array
-            if frame_count > 1:
-                f.write(f"const SpriteDefinition* {name}_animation[{frame_count}] = {{\n")
-                for frame_idx in range(frame_count):
-                    f.write(f"    &{name}_frame{frame_idx}")
-                    if frame_idx < frame_count - 1:
-                        f.write(",")
-                    f.write("\n")
-                f.write("};\n\n")
-    
-    def _write_header_file(self, output_path, name, size, frame_count):
-        """Write the header file."""
-        with open(output_path, 'w') as f:
-            guard = f"{name.upper()}_H"
-            f.write(f"#ifndef {guard}\n")
-            f.write(f"#define {guard}\n\n")
-            f.write("#include <genesis.h>\n\n")
-            
-            # Declarations
-            f.write(f"extern const u16 {name}_palette[16];\n")
-            
-            for frame_idx in range(frame_count):
-                f.write(f"extern const u8 {name}_frame{frame_idx}_data[];\n")
-                f.write(f"extern const SpriteDefinition {name}_frame{frame_idx};\n")
-            
-            if frame_count > 1:
-                f.write(f"extern const SpriteDefinition* {name}_animation[{frame_count}];\n")
-            
-            f.write(f"\n#define {name.upper()}_FRAME_COUNT {frame_count}\n")
-            f.write(f"#define {name.upper()}_SIZE {size}\n")
-            
-            f.write(f"\n#endif // {guard}\n")
+    def _write_tileset_c_file(self, f, name, tile_data, frame_maps,
+                              palette_data):
+        """Write the C source of a deduplicated tile set to a text stream.
+        
+        Frame maps list tile attribute words (index plus flip bits) in
+        the same order as sprite tiles: column-major within each 32x32
+        sprite block.
+        """
+        out = CSourceWriter(f)
+        out.include(f"{name}.h")
+        
+        out.u16_array(f"const u16 {name}_palette[16]", palette_data, 8)
+        out.u8_array(f"const u8 {name}_tiles[{len(tile_data)}]",
+                     tile_data, 16)
+        
+        for frame_idx, frame_map in enumerate(frame_maps):
+            out.u16_array(
+                f"const u16 {name}_frame{frame_idx}_map[{len(frame_map)}]",
+                frame_map, 8)
+        
+        frame_count = len(frame_maps)
+        if frame_count > 1:
+            out.pointer_array(
+                f"const u16* {name}_animation[{frame_count}]",
+                [f"{name}_frame{i}_map" for i in range(frame_count)])
+    
+    def _write_tileset_header_file(self, f, name, size, frame_count,
+                                   tile_count, compression=COMPRESSION_NONE):
+        """Write the header of a deduplicated tile set to a text stream."""
+        guard = f"{name.upper()}_H"
+        tiles_w = (size + 7) // 8
+        tiles_h = (size + 7) // 8
+        f.write(f"#ifndef {guard}\n")
+        f.write(f"#define {guard}\n\n")
+        f.write("#include <genesis.h>\n\n")
+        
+        # Declarations
+        f.write(f"extern const u16 {name}_palette[16];\n")
+        f.write(f"extern const u8 {name}_tiles[];\n")
+        
+        for frame_idx in range(frame_count):
+            f.write(f"extern const u16 {name}_frame{frame_idx}_map[{tiles_w * tiles_h}];\n")
+        
+        if frame_count > 1:
+            f.write(f"extern const u16* {name}_animation[{frame_count}];\n")
+        
+        f.write(f"\n#define {name.upper()}_FRAME_COUNT {frame_count}\n")
+        f.write(f"#define {name.upper()}_SIZE {size}\n")
+        f.write(f"#define {name.upper()}_TILE_COUNT {tile_count}\n")
+        f.write(f"#define {name.upper()}_TILES_W {tiles_w}\n")
+        f.write(f"#define {name.upper()}_TILES_H {tiles_h}\n")
+        self._write_sprite_blocks(f, name, size)
+        self._write_compression_define(f, name, compression)
+        
+        f.write(f"\n#endif // {guard}\n")
     
-    def _save_sprite_sheet(self, frames, output_path, size):
-        """Save a sprite sheet PNG for reference."""
+    def _save_sprite_sheet(self, frames, fp, size):
+        """Save a sprite sheet PNG for reference to a path or binary stream."""
         if not frames:
             return
         
@@ -231,7 +784,7 @@ class SGDKExporter:
             rgb_frame = frame.convert("RGB")
             sheet.paste(rgb_frame, (i * size, 0))
         
-        sheet.save(output_path)
+        sheet.save(fp, format="PNG")
 
 
 def export():
@@ -1,31 +1,223 @@
 """Character generator for SGDK sprites."""
 
-from PIL import Image, ImageDraw
+from PIL import Image, ImageColor, ImageDraw
+import hashlib
+import json
 import math
+from .cache import FrameCache
+from .metrics import metrics
+from .palette import get_palette
+from .parts import draw_part, geometry_version
+
+
+# Fields that determine the rendered sprite, with the defaults used when
+# drawing. Anything else in the character dict (name, frame, ...) is ignored.
+CHARACTER_DEFAULTS = {
+    "head_type": "round",
+    "body_type": "normal",
+    "arm_type": "normal",
+    "leg_type": "normal",
+    "head_color": "#FFDDAA",
+    "body_color": "#0066CC",
+    "arm_color": "#FFDDAA",
+    "leg_color": "#0066CC",
+    "size": 32,
+    "animation_frames": 1,
+}
+
+# Colour of outlines and facial features
+OUTLINE_COLOR = "#000000"
+
+# Role codes parts are drawn with before colours are applied: 0 is the
+# background, the parts follow the order of the exporter's palette
+ROLE_HEAD = 1
+ROLE_BODY = 2
+ROLE_ARM = 3
+ROLE_LEG = 4
+ROLE_OUTLINE = 5
+ROLE_COLOR_FIELDS = ("head_color", "body_color", "arm_color", "leg_color")
+ROLE_TYPE_FIELDS = ("head_type", "body_type", "arm_type", "leg_type")
+
+
+def character_digest(character_data):
+    """Return a stable hex digest of the fields that affect rendering.
+    
+    Colours are compared case-insensitively, so "#ffddaa" and "#FFDDAA"
+    produce the same digest. A CharacterSpec carries its digest already.
+    """
+    digest = getattr(character_data, "digest", None)
+    if digest is not None:
+        return digest
+    
+    canonical = {}
+    for key, default in CHARACTER_DEFAULTS.items():
+        value = character_data.get(key, default)
+        if key.endswith("_color") and isinstance(value, str):
+            value = value.upper()
+        canonical[key] = value
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
 
 class CharacterGenerator:
     """Generates character sprites based on user specifications."""
     
-    def __init__(self):
+    def __init__(self, cache_size=512, role_cache_size=1024):
         self.base_size = 32
+        self.frame_cache = FrameCache(cache_size)
+        # Colour-free role maps, shared by every colour combination
+        self.role_cache = FrameCache(role_cache_size)
     
     def generate_character(self, character_data, frame=0):
         """Generate a character sprite based on the given data.
         
+        Rendered frames are cached by character digest and animation
+        frame, so cycling through an animation only draws each frame once.
+        
         Args:
             character_data (dict): Character specification
             frame (int): Animation frame number
             
         Returns:
-            PIL.Image: Generated character sprite
+            PIL.Image: Generated character sprite (a copy the caller owns)
         """
-        size = character_data.get("size", 32)
+        total_frames = character_data.get("animation_frames", 1)
+        frame = frame % total_frames if total_frames > 1 else 0
+        
+        key = (character_digest(character_data), frame, geometry_version())
+        image = self.frame_cache.get(key)
+        if image is None:
+            image = self._render_character(character_data, frame)
+            self.frame_cache.put(key, image)
+        return image.copy()
+    
+    def generate_indexed(self, character_data, palette, frame=0):
+        """Generate a character sprite drawn directly in palette indices.
+        
+        Each part is drawn with the index of its colour in ``palette``
+        and the background is index 0, producing the same indices as
+        rendering RGBA and quantizing to the palette, without the alpha
+        paste or the nearest-colour search over every pixel. The one
+        exception is a colour within a few units of an earlier palette
+        entry (e.g. "#010101" next to black): quantize moves some of its
+        pixels onto that entry, while this keeps all of them on the
+        colour's own entry.
+        
+        Args:
+            character_data (dict): Character specification
+            palette (Palette): Palette, or a list of at most 256 colours
+            frame (int): Animation frame number
+            
+        Returns:
+            PIL.Image: "P" mode sprite with the palette attached (a copy
+            the caller owns)
+        """
+        total_frames = character_data.get("animation_frames", 1)
+        frame = frame % total_frames if total_frames > 1 else 0
+        
+        palette = get_palette(palette)
+        key = (character_digest(character_data), frame, palette,
+               geometry_version())
+        image = self.frame_cache.get(key)
+        if image is None:
+            image = self._render_character(character_data, frame, palette)
+            self.frame_cache.put(key, image)
+        return image.copy()
+    
+    def generate_roles(self, character_data, frame=0):
+        """Generate a character sprite drawn in role codes.
         
-        # Create image with transparency
-        image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(image)
+        Every pixel holds the role of what covers it (0 background, then
+        ROLE_HEAD to ROLE_LEG and ROLE_OUTLINE) whatever the colours, so
+        one render serves any palette listing the colours in role order.
+        Parts are always drawn with their own outline, even where a
+        part's colour equals the outline colour.
         
+        Args:
+            character_data (dict): Character specification
+            frame (int): Animation frame number
+            
+        Returns:
+            PIL.Image: "P" mode sprite of role codes (a copy the caller
+            owns)
+        """
+        total_frames = character_data.get("animation_frames", 1)
+        frame = frame % total_frames if total_frames > 1 else 0
+        return self._render_roles(character_data, frame).copy()
+    
+    def generate_animation(self, character_data):
+        """Generate every animation frame of a character.
+        
+        Args:
+            character_data (dict): Character specification
+            
+        Returns:
+            list: One PIL.Image per animation frame
+        """
+        frame_count = max(1, character_data.get("animation_frames", 1))
+        return [self.generate_character(character_data, frame)
+                for frame in range(frame_count)]
+    
+    def cache_stats(self):
+        """Return hit/miss/eviction counters of the frame cache."""
+        return self.frame_cache.stats()
+    
+    def role_cache_stats(self):
+        """Return hit/miss/eviction counters of the role map cache."""
+        return self.role_cache.stats()
+    
+    def _render_character(self, character_data, frame, palette=None):
+        """Draw a single frame of the character without frame caching.
+        
+        Parts are drawn as role codes (see _render_roles), which are then
+        coloured: RGBA, or palette indices into a "P" image when a
+        palette is given.
+        """
+        if palette is not None:
+            palette = get_palette(palette)
+        inks = self.role_inks(character_data, palette)
+        roles = self._render_roles(character_data, frame,
+                                   self.outline_inked_roles(inks))
+        
+        if palette is None:
+            # Role codes index a palette of the RGBA colours
+            image = roles.copy()
+            image.putpalette([c for ink in inks for c in ink], "RGBA")
+            return image.convert("RGBA")
+        
+        # Translate role codes to palette indices
+        table = bytes(inks) + bytes(256 - len(inks))
+        image = Image.frombytes("P", roles.size,
+                                roles.tobytes().translate(table))
+        image.putpalette(palette.flat)
+        return image
+    
+    @staticmethod
+    def role_inks(character_data, palette=None):
+        """Return the ink of every role code, background first.
+        
+        Args:
+            character_data (dict): Character specification
+            palette (Palette): Palette to take indices from, or None for
+                RGBA tuples
+            
+        Returns:
+            list: ROLE_OUTLINE + 1 inks
+        """
+        # Colours of roles 1 to ROLE_OUTLINE
+        colors = [character_data.get(field, CHARACTER_DEFAULTS[field])
+                  for field in ROLE_COLOR_FIELDS]
+        colors.append(OUTLINE_COLOR)
+        
+        if palette is None:
+            # The background stays fully transparent
+            return [(0, 0, 0, 0)] + [ImageColor.getcolor(color, "RGBA")
+                                     for color in colors]
+        return [0] + [palette.index_of(color) for color in colors]
+    
+    @staticmethod
+    def pose(character_data, frame):
+        """Return the whole-pixel walk and bob offsets of a frame."""
         # Animation offset for walking
         total_frames = character_data.get("animation_frames", 1)
         if total_frames > 1:
@@ -35,208 +227,86 @@ class CharacterGenerator:
             walk_offset = 0
             bob_offset = 0
         
+        # Parts are only ever placed at whole-pixel offsets
+        return int(walk_offset), int(bob_offset)
+    
+    @staticmethod
+    def outline_inked_roles(inks):
+        """Return the roles whose ink equals the outline's.
+        
+        ImageDraw skips the outline of a shape filled with the outline's
+        own ink, which changes its edge pixels; such parts are drawn with
+        the outline role as their fill to reproduce that.
+        """
+        return frozenset(role for role in range(ROLE_HEAD, ROLE_OUTLINE)
+                         if inks[role] == inks[ROLE_OUTLINE])
+    
+    def _render_roles(self, character_data, frame, outline_inked=frozenset()):
+        """Return the role map of one frame, drawing it on a cache miss.
+        
+        The role map depends only on the part types, the size and the
+        whole-pixel animation offsets, never on colours, so colour edits
+        and other frames with the same pose reuse it.
+        
+        Args:
+            character_data (dict): Character specification
+            frame (int): Animation frame number
+            outline_inked (frozenset): Roles filled with the outline ink
+            
+        Returns:
+            PIL.Image: "P" image of role codes, 0 where nothing is drawn
+            (shared with the cache; do not modify)
+        """
+        size = character_data.get("size", 32)
+        walk_offset, bob_offset = self.pose(character_data, frame)
+        
+        part_types = tuple(character_data.get(field, CHARACTER_DEFAULTS[field])
+                           for field in ROLE_TYPE_FIELDS)
+        key = (part_types, size, walk_offset, bob_offset, outline_inked,
+               geometry_version())
+        roles = self.role_cache.get(key)
+        if roles is not None:
+            return roles
+        
+        roles = Image.new("P", (size, size), 0)
+        draw = ImageDraw.Draw(roles)
+        colors = {field: ROLE_OUTLINE if role in outline_inked else role
+                  for role, field in enumerate(ROLE_COLOR_FIELDS, ROLE_HEAD)}
+        colors["outline"] = ROLE_OUTLINE
+        
         # Draw character parts
-        self._draw_legs(draw, character_data, size, walk_offset)
-        self._draw_body(draw, character_data, size, bob_offset)
-        self._draw_arms(draw, character_data, size, walk_offset, bob_offset)
-        self._draw_head(draw, character_data, size, bob_offset)
+        with metrics.timer("generator.draw_legs"):
+            self._draw_legs(draw, character_data, colors, size, walk_offset)
+        with metrics.timer("generator.draw_body"):
+            self._draw_body(draw, character_data, colors, size, bob_offset)
+        with metrics.timer("generator.draw_arms"):
+            self._draw_arms(draw, character_data, colors, size, walk_offset, bob_offset)
+        with metrics.timer("generator.draw_head"):
+            self._draw_head(draw, character_data, colors, size, bob_offset)
         
-        return image
+        self.role_cache.put(key, roles)
+        return roles
     
-    def _draw_head(self, draw, data, size, bob_offset):
+    def _draw_head(self, draw, data, colors, size, bob_offset):
         """Draw the character's head."""
-        head_type = data.get("head_type", "round")
-        color = data.get("head_color", "#FFDDAA")
-        
-        # Head position and size
-        head_size = size // 4
-        head_x = size // 2 - head_size // 2
-        head_y = size // 6 - int(bob_offset)
-        
-        if head_type == "round":
-            draw.ellipse([head_x, head_y, head_x + head_size, head_y + head_size], 
-                        fill=color, outline="#000000", width=1)
-        elif head_type == "square":
-            draw.rectangle([head_x, head_y, head_x + head_size, head_y + head_size], 
-                          fill=color, outline="#000000", width=1)
-        elif head_type == "oval":
-            draw.ellipse([head_x, head_y, head_x + head_size, head_y + head_size + 4], 
-                        fill=color, outline="#000000", width=1)
-        elif head_type == "triangle":
-            points = [
-                (head_x + head_size // 2, head_y),
-                (head_x, head_y + head_size),
-                (head_x + head_size, head_y + head_size)
-            ]
-            draw.polygon(points, fill=color, outline="#000000")
-        
-        # Draw simple face
-        eye_size = max(1, head_size // 8)
-        eye_y = head_y + head_size // 3
-        
-        # Eyes
-        draw.ellipse([head_x + head_size // 3 - eye_size, eye_y, 
-                     head_x + head_size // 3 + eye_size, eye_y + eye_size * 2], 
-                    fill="#000000")
-        draw.ellipse([head_x + 2 * head_size // 3 - eye_size, eye_y, 
-                     head_x + 2 * head_size // 3 + eye_size, eye_y + eye_size * 2], 
-                    fill="#000000")
-        
-        # Mouth
-        mouth_y = head_y + 2 * head_size // 3
-        draw.arc([head_x + head_size // 4, mouth_y, 
-                 head_x + 3 * head_size // 4, mouth_y + head_size // 4], 
-                0, 180, fill="#000000", width=1)
-    
-    def _draw_body(self, draw, data, size, bob_offset):
+        draw_part(draw, "head", data.get("head_type", "round"), size,
+                  0, int(bob_offset), colors["head_color"], colors["outline"])
+    
+    def _draw_body(self, draw, data, colors, size, bob_offset):
         """Draw the character's body."""
-        body_type = data.get("body_type", "normal")
-        color = data.get("body_color", "#0066CC")
-        
-        # Body position and size
-        body_width = size // 3
-        body_height = size // 2
-        body_x = size // 2 - body_width // 2
-        body_y = size // 3 - int(bob_offset)
-        
-        if body_type == "normal":
-            draw.rectangle([body_x, body_y, body_x + body_width, body_y + body_height], 
-                          fill=color, outline="#000000", width=1)
-        elif body_type == "muscular":
-            body_width = int(body_width * 1.3)
-            body_x = size // 2 - body_width // 2
-            draw.rectangle([body_x, body_y, body_x + body_width, body_y + body_height], 
-                          fill=color, outline="#000000", width=1)
-        elif body_type == "slim":
-            body_width = int(body_width * 0.7)
-            body_x = size // 2 - body_width // 2
-            draw.rectangle([body_x, body_y, body_x + body_width, body_y + body_height], 
-                          fill=color, outline="#000000", width=1)
-        elif body_type == "round":
-            draw.ellipse([body_x, body_y, body_x + body_width, body_y + body_height], 
-                        fill=color, outline="#000000", width=1)
-    
-    def _draw_arms(self, draw, data, size, walk_offset, bob_offset):
+        draw_part(draw, "body", data.get("body_type", "normal"), size,
+                  0, int(bob_offset), colors["body_color"], colors["outline"])
+    
+    def _draw_arms(self, draw, data, colors, size, walk_offset, bob_offset):
         """Draw the character's arms."""
-        arm_type = data.get("arm_type", "normal")
-        color = data.get("arm_color", "#FFDDAA")
-        
-        # Arm dimensions
-        arm_width = size // 8
-        arm_length = size // 3
-        
-        # Left arm
-        left_arm_x = size // 2 - size // 3 - arm_width
-        arm_y = size // 3 + size // 12 - int(bob_offset)
-        
-        # Right arm  
-        right_arm_x = size // 2 + size // 3
-        
-        # Arm swing animation
-        left_swing = int(walk_offset)
-        right_swing = -int(walk_offset)
-        
-        if arm_type == "normal":
-            # Left arm
-            draw.rectangle([left_arm_x, arm_y + left_swing, 
-                          left_arm_x + arm_width, arm_y + arm_length + left_swing], 
-                         fill=color, outline="#000000", width=1)
-            # Right arm
-            draw.rectangle([right_arm_x, arm_y + right_swing, 
-                          right_arm_x + arm_width, arm_y + arm_length + right_swing], 
-                         fill=color, outline="#000000", width=1)
-        elif arm_type == "muscular":
-            arm_width = int(arm_width * 1.5)
-            # Left arm
-            draw.rectangle([left_arm_x, arm_y + left_swing, 
-                          left_arm_x + arm_width, arm_y + arm_length + left_swing], 
-                         fill=color, outline="#000000", width=1)
-            # Right arm
-            draw.rectangle([right_arm_x, arm_y + right_swing, 
-                          right_arm_x + arm_width, arm_y + arm_length + right_swing], 
-                         fill=color, outline="#000000", width=1)
-        elif arm_type == "thin":
-            arm_width = max(1, int(arm_width * 0.6))
-            # Left arm
-            draw.rectangle([left_arm_x, arm_y + left_swing, 
-                          left_arm_x + arm_width, arm_y + arm_length + left_swing], 
-                         fill=color, outline="#000000", width=1)
-            # Right arm
-            draw.rectangle([right_arm_x, arm_y + right_swing, 
-                          right_arm_x + arm_width, arm_y + arm_length + right_swing], 
-                         fill=color, outline="#000000", width=1)
-        elif arm_type == "long":
-            arm_length = int(arm_length * 1.3)
-            # Left arm
-            draw.rectangle([left_arm_x, arm_y + left_swing, 
-                          left_arm_x + arm_width, arm_y + arm_length + left_swing], 
-                         fill=color, outline="#000000", width=1)
-            # Right arm
-            draw.rectangle([right_arm_x, arm_y + right_swing, 
-                          right_arm_x + arm_width, arm_y + arm_length + right_swing], 
-                         fill=color, outline="#000000", width=1)
-    
-    def _draw_legs(self, draw, data, size, walk_offset):
+        draw_part(draw, "arm", data.get("arm_type", "normal"), size,
+                  int(walk_offset), int(bob_offset), colors["arm_color"],
+                  colors["outline"])
+    
+    def _draw_legs(self, draw, data, colors, size, walk_offset):
         """Draw the character's legs."""
-        leg_type = data.get("leg_type", "normal")
-        color = data.get("leg_color", "#0066CC")
-        
-        # Leg dimensions
-        leg_width = size // 8
-        leg_length = size // 3
-        
-        # Leg positions
-        left_leg_x = size // 2 - size // 6 - leg_width // 2
-        right_leg_x = size // 2 + size // 6 - leg_width // 2
-        leg_y = size // 2 + size // 6
-        
-        # Walking animation
-        left_step = int(walk_offset)
-        right_step = -int(walk_offset)
-        
-        if leg_type == "normal":
-            # Left leg
-            draw.rectangle([left_leg_x, leg_y, 
-                          left_leg_x + leg_width, leg_y + leg_length + left_step], 
-                         fill=color, outline="#000000", width=1)
-            # Right leg
-            draw.rectangle([right_leg_x, leg_y, 
-                          right_leg_x + leg_width, leg_y + leg_length + right_step], 
-                         fill=color, outline="#000000", width=1)
-        elif leg_type == "muscular":
-            leg_width = int(leg_width * 1.5)
-            left_leg_x = size // 2 - size // 6 - leg_width // 2
-            right_leg_x = size // 2 + size // 6 - leg_width // 2
-            # Left leg
-            draw.rectangle([left_leg_x, leg_y, 
-                          left_leg_x + leg_width, leg_y + leg_length + left_step], 
-                         fill=color, outline="#000000", width=1)
-            # Right leg
-            draw.rectangle([right_leg_x, leg_y, 
-                          right_leg_x + leg_width, leg_y + leg_length + right_step], 
-                         fill=color, outline="#000000", width=1)
-        elif leg_type == "thin":
-            leg_width = max(1, int(leg_width * 0.6))
-            left_leg_x = size // 2 - size // 6 - leg_width // 2
-            right_leg_x = size // 2 + size // 6 - leg_width // 2
-            # Left leg
-            draw.rectangle([left_leg_x, leg_y, 
-                          left_leg_x + leg_width, leg_y + leg_length + left_step], 
-                         fill=color, outline="#000000", width=1)
-            # Right leg
-            draw.rectangle([right_leg_x, leg_y, 
-                          right_leg_x + leg_width, leg_y + leg_length + right_step], 
-                         fill=color, outline="#000000", width=1)
-        elif leg_type == "long":
-            leg_length = int(leg_length * 1.3)
-            # Left leg
-            draw.rectangle([left_leg_x, leg_y, 
-                          left_leg_x + leg_width, leg_y + leg_length + left_step], 
-                         fill=color, outline="#000000", width=1)
-            # Right leg
-            draw.rectangle([right_leg_x, leg_y, 
-                          right_leg_x + leg_width, leg_y + leg_length + right_step], 
-                         fill=color, outline="#000000", width=1)
+        draw_part(draw, "leg", data.get("leg_type", "normal"), size,
+                  int(walk_offset), 0, colors["leg_color"], colors["outline"])
 
 
 def generate():
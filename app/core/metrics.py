@@ -0,0 +1,184 @@
+"""Hot-path timing instrumentation with Prometheus text output.
+
+Instrumentation is off unless enabled (``SGDK_METRICS=1`` or
+``metrics.enabled = True``). While disabled, ``metrics.timer()`` hands
+back a shared no-op context manager, so instrumented code pays for one
+attribute check and an empty ``with`` block.
+"""
+
+import bisect
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+STAGE_METRIC = "sgdk_stage_duration_seconds"
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one observation."""
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count) consistently."""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.total, self.count
+        cumulative = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class _NullTimer:
+    """Context manager that does nothing; used while disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Context manager that records its duration into a histogram."""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return (str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n"))
+
+
+def _labels(pairs):
+    """Render label pairs as ``{a="1",b="2"}`` (empty for no labels)."""
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"'
+                          for key, value in pairs) + "}"
+
+
+class Metrics:
+    """Registry of stage timers and labelled counters."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        """Return a context manager timing one run of stage."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._histogram(stage))
+
+    def observe(self, stage, seconds):
+        """Record a duration measured elsewhere."""
+        if self.enabled:
+            self._histogram(stage).observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        """Add amount to the counter name with the given labels."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        """Drop every recorded value."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def render_prometheus(self, samples=()):
+        """Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            samples: Extra ``(name, type, value)`` tuples, e.g. cache stats
+
+        Returns:
+            str: Exposition text ending in a newline
+        """
+        with self._lock:
+            stages = sorted(self._stages.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        if stages:
+            lines.append(f"# HELP {STAGE_METRIC} Time spent in instrumented "
+                         "pipeline stages.")
+            lines.append(f"# TYPE {STAGE_METRIC} histogram")
+        for stage, histogram in stages:
+            cumulative, total, count = histogram.snapshot()
+            for bound, value in zip(histogram.buckets, cumulative):
+                labels = _labels([("stage", stage), ("le", repr(bound))])
+                lines.append(f"{STAGE_METRIC}_bucket{labels} {value}")
+            labels = _labels([("stage", stage), ("le", "+Inf")])
+            lines.append(f"{STAGE_METRIC}_bucket{labels} {cumulative[-1]}")
+            labels = _labels([("stage", stage)])
+            lines.append(f"{STAGE_METRIC}_sum{labels} {total!r}")
+            lines.append(f"{STAGE_METRIC}_count{labels} {count}")
+
+        current = None
+        for (name, pairs), value in counters:
+            if name != current:
+                lines.append(f"# TYPE {name} counter")
+                current = name
+            lines.append(f"{name}{_labels(pairs)} {value}")
+
+        for name, metric_type, value in samples:
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def _histogram(self, stage):
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram())
+        return histogram
+
+
+# Process-wide registry used by the generator, exporter and web app
+metrics = Metrics(enabled=os.environ.get("SGDK_METRICS") == "1")
@@ -0,0 +1,107 @@
+"""Immutable colour palettes shared across frames and characters."""
+
+import functools
+from PIL import Image, ImageColor
+
+
+class Palette:
+    """Immutable palette with its derived forms computed once.
+
+    Behaves like a read-only sequence of "#RRGGBB" strings, so it can be
+    used anywhere a list of colours was. Instances are interned by
+    get_palette(), so every frame and character using the same colours
+    shares the parsed RGB values, the PIL palette image, the Mega Drive
+    colour words and the reverse lookup table.
+
+    There are two sets of colour words. ``cram_words`` keeps the top 3
+    bits of each channel, as CRAM stores them, and matches
+    palette_alloc.md_word. ``md_words`` is the exporter's original
+    encoding, kept so existing exports do not change: it shifts each
+    channel right by 4, so the channel's low bit lands in the unused bit
+    above it and CRAM sees bits 4-6 of the channel instead of 5-7 (for
+    example "#808080" reads as black). SGDKExporter uses it unless
+    created with ``exact_cram=True``.
+    """
+
+    __slots__ = ("colors", "rgb", "flat", "md_words", "cram_words", "image",
+                 "_lookup", "_hash")
+
+    def __init__(self, colors):
+        rgb = tuple(ImageColor.getrgb(color)[:3] for color in colors)
+        flat = tuple(component for entry in rgb for component in entry)
+
+        image = Image.new("P", (1, 1))
+        # Pad palette to 768 bytes (256 colors * 3 components)
+        image.putpalette(flat + (0,) * (768 - len(flat)))
+
+        set_attr = object.__setattr__
+        set_attr(self, "colors", tuple("#%02X%02X%02X" % entry for entry in rgb))
+        set_attr(self, "rgb", rgb)
+        set_attr(self, "flat", flat + (0,) * (768 - len(flat)))
+        # Mega Drive color format: 0000BBB0GGG0RRR0. The legacy words
+        # shift by 4 and spill into neighbouring bits (see class docstring)
+        set_attr(self, "md_words", tuple(((b >> 4) << 9) | ((g >> 4) << 5) |
+                                         ((r >> 4) << 1) for r, g, b in rgb))
+        set_attr(self, "cram_words", tuple(((b >> 5) << 9) | ((g >> 5) << 5) |
+                                           ((r >> 5) << 1) for r, g, b in rgb))
+        set_attr(self, "image", image)
+        set_attr(self, "_lookup", {})
+        set_attr(self, "_hash", hash(self.colors))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Palette is immutable")
+
+    def index_of(self, color):
+        """Return the index of the entry closest to color.
+
+        Exact matches win and ties go to the lowest index, which is the
+        index Image.quantize assigns to a pixel of that colour.
+        """
+        index = self._lookup.get(color)
+        if index is None:
+            r, g, b = ImageColor.getrgb(color)[:3]
+            index = min(range(len(self.rgb)),
+                        key=lambda i: ((self.rgb[i][0] - r) ** 2 +
+                                       (self.rgb[i][1] - g) ** 2 +
+                                       (self.rgb[i][2] - b) ** 2, i))
+            self._lookup[color] = index
+        return index
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __getitem__(self, index):
+        return self.colors[index]
+
+    def __iter__(self):
+        return iter(self.colors)
+
+    def __eq__(self, other):
+        if isinstance(other, Palette):
+            return self.colors == other.colors
+        return NotImplemented
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return f"Palette({list(self.colors)!r})"
+
+
+@functools.lru_cache(maxsize=1024)
+def _interned_palette(colors):
+    return Palette(colors)
+
+
+def get_palette(colors):
+    """Return the shared Palette for a sequence of colours.
+
+    Args:
+        colors: A Palette, or an iterable of colour strings
+
+    Returns:
+        Palette: Interned palette instance
+    """
+    if isinstance(colors, Palette):
+        return colors
+    return _interned_palette(tuple(colors))
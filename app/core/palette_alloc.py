@@ -0,0 +1,164 @@
+"""Shared palette allocation across characters for the Mega Drive CRAM."""
+
+from PIL import ImageColor
+from .generator import CHARACTER_DEFAULTS, ROLE_COLOR_FIELDS
+
+# CRAM holds four palette lines of 16 colours; entry 0 of each line is
+# the transparent colour, leaving 15 for the characters using the line
+PALETTE_LINES = 4
+LINE_COLORS = 15
+TRANSPARENT = "#000000"
+
+
+def snap_color(color):
+    """Snap a colour to the 9-bit Mega Drive colour space.
+
+    Each channel keeps its top 3 bits, expanded back to 8 bits by bit
+    replication so the full range maps onto 0x00-0xFF.
+
+    Args:
+        color (str): Any colour PIL understands, e.g. "#FFDDAA"
+
+    Returns:
+        str: The snapped colour as "#RRGGBB"
+    """
+    channels = []
+    for value in ImageColor.getrgb(color)[:3]:
+        level = value >> 5
+        channels.append((level << 5) | (level << 2) | (level >> 1))
+    return "#%02X%02X%02X" % tuple(channels)
+
+
+def md_word(color):
+    """Return the CRAM word of a colour from its 3-bit channel levels.
+
+    This is the level a channel was snapped to by snap_color, so
+    "#929292" is level 4, the same word as Palette.cram_words. The
+    legacy Palette.md_words used by default for single-character
+    exports gives 0x1332 instead (see Palette).
+
+    Args:
+        color (str): Any colour PIL understands
+
+    Returns:
+        int: Mega Drive colour word, 0000BBB0GGG0RRR0
+    """
+    r, g, b = (value >> 5 for value in ImageColor.getrgb(color)[:3])
+    return (b << 9) | (g << 5) | (r << 1)
+
+
+def snap_character(character_data):
+    """Return a copy of a character with every part colour snapped.
+
+    Missing colours are filled in with their defaults, snapped too.
+    """
+    snapped = dict(character_data)
+    for field in ROLE_COLOR_FIELDS:
+        snapped[field] = snap_color(
+            character_data.get(field, CHARACTER_DEFAULTS[field]))
+    return snapped
+
+
+def character_colors(character_data):
+    """Return the distinct snapped colours a character needs in a line.
+
+    Colours that snap to black are left out: they use the transparent
+    entry 0 every line starts with, as outlines do.
+    """
+    colors = []
+    for field in ROLE_COLOR_FIELDS:
+        color = snap_color(character_data.get(field,
+                                              CHARACTER_DEFAULTS[field]))
+        if color != TRANSPARENT and color not in colors:
+            colors.append(color)
+    return colors
+
+
+class PaletteAllocation:
+    """Palette lines shared by a batch of characters."""
+
+    def __init__(self, lines, assignments):
+        self.lines = lines
+        self.assignments = assignments
+
+    def palette(self, line):
+        """Return the 16-entry palette of a line, transparent entry first."""
+        colors = self.lines[line]
+        return ([TRANSPARENT] + colors
+                + [TRANSPARENT] * (LINE_COLORS - len(colors)))
+
+    def palettes(self):
+        """Return the 16-entry palette of every line."""
+        return [self.palette(line) for line in range(len(self.lines))]
+
+    def report(self, names):
+        """Describe which characters share which line.
+
+        Args:
+            names (list): Character names in allocation order
+
+        Returns:
+            list: Per line, a dict with ``line``, ``colors`` and
+            ``characters``
+        """
+        report = [{"line": line, "colors": list(colors), "characters": []}
+                  for line, colors in enumerate(self.lines)]
+        for name, line in zip(names, self.assignments):
+            report[line]["characters"].append(name)
+        return report
+
+
+def allocate_palettes(characters, max_lines=PALETTE_LINES,
+                      line_colors=LINE_COLORS):
+    """Bin characters into shared palette lines.
+
+    Characters are placed largest colour set first, each into the line
+    with room that it adds the fewest new colours to (the earliest line
+    on ties). A new line is only started when no line has room. This is
+    a greedy heuristic, not an optimal packing.
+
+    Args:
+        characters (list): Character specifications
+        max_lines (int): Palette lines available
+        line_colors (int): Colours per line besides the transparent one
+
+    Returns:
+        PaletteAllocation: Line colours and the line of each character
+
+    Raises:
+        ValueError: If a character has too many colours or the batch
+            needs more than ``max_lines`` lines
+    """
+    color_sets = [character_colors(data) for data in characters]
+    order = sorted(range(len(color_sets)),
+                   key=lambda i: len(color_sets[i]), reverse=True)
+
+    lines = []
+    line_sets = []
+    assignments = [0] * len(color_sets)
+    for index in order:
+        colors = color_sets[index]
+        if len(colors) > line_colors:
+            raise ValueError(f"Character {index} needs {len(colors)} colours, "
+                             f"more than the {line_colors} of a palette line")
+
+        best_line, best_added = None, None
+        for line, line_set in enumerate(line_sets):
+            added = [color for color in colors if color not in line_set]
+            if len(line_set) + len(added) > line_colors:
+                continue
+            if best_added is None or len(added) < len(best_added):
+                best_line, best_added = line, added
+        if best_line is None:
+            if len(lines) == max_lines:
+                raise ValueError(f"Characters need more than {max_lines} "
+                                 "palette lines")
+            best_line, best_added = len(lines), colors
+            lines.append([])
+            line_sets.append(set())
+
+        lines[best_line].extend(best_added)
+        line_sets[best_line].update(best_added)
+        assignments[index] = best_line
+
+    return PaletteAllocation(lines, assignments)
@@ -0,0 +1,282 @@
+"""Data-driven geometry of the character parts.
+
+Every part type registers a function computing its shapes from the
+sprite size and the animation offsets. Shapes are memoized per size and
+offsets, so drawing a part is one table lookup plus the draw calls, and
+a new part type is one more registered function rather than another
+branch every frame walks through.
+"""
+
+import functools
+from PIL import ImageDraw
+
+# Ink placeholders in shape options, resolved when the shapes are drawn
+PART = "part"
+OUTLINE = "outline"
+
+# Registered geometry functions by part and part type
+PART_TYPES = {"head": {}, "body": {}, "arm": {}, "leg": {}}
+
+# Bumped by every registration; renderers key their caches on it
+_geometry_version = 0
+
+
+def geometry_version():
+    """Return a number that changes whenever a part type is registered.
+
+    Caches of rendered parts or frames include it in their keys, so
+    registering or overriding a part type retires their old entries.
+    """
+    return _geometry_version
+
+
+@functools.lru_cache(maxsize=4096)
+def part_shapes(part, part_type, size, walk_offset=0, bob_offset=0):
+    """Return the shapes of one part, computing them on first use.
+
+    Unknown part types have no shapes of their own; heads still get a
+    face, whatever their type.
+
+    Args:
+        part (str): "head", "body", "arm" or "leg"
+        part_type (str): Registered type, e.g. "round"
+        size (int): Sprite width and height in pixels
+        walk_offset (int): Whole-pixel walk offset of the frame
+        bob_offset (int): Whole-pixel bob offset of the frame
+
+    Returns:
+        tuple: ``(method, args, options)`` shapes in drawing order
+    """
+    geometry = PART_TYPES[part].get(part_type)
+    shapes = geometry(size, walk_offset, bob_offset) if geometry else []
+    if part == "head":
+        shapes = shapes + _face(size, bob_offset)
+    return tuple(shapes)
+
+
+def draw_part(draw, part, part_type, size, walk_offset, bob_offset, color,
+              outline):
+    """Draw one part of a character.
+
+    Args:
+        draw (ImageDraw.ImageDraw): Target to draw on
+        part (str): "head", "body", "arm" or "leg"
+        part_type (str): Registered type, e.g. "round"
+        size (int): Sprite width and height in pixels
+        walk_offset (int): Whole-pixel walk offset of the frame
+        bob_offset (int): Whole-pixel bob offset of the frame
+        color: Ink of the part (hashable)
+        outline: Ink of outlines and facial features (hashable)
+    """
+    for method, args, options in _inked_shapes(part, part_type, size,
+                                               walk_offset, bob_offset,
+                                               color, outline):
+        method(draw, *args, **options)
+
+
+@functools.lru_cache(maxsize=4096)
+def _inked_shapes(part, part_type, size, walk_offset, bob_offset, color,
+                  outline):
+    """Return part_shapes with the inks filled in and methods looked up.
+
+    Parts are drawn with a handful of inks (role codes, or one palette's
+    indices), so this stays small and saves resolving every option of
+    every shape each frame.
+    """
+    inks = {PART: color, OUTLINE: outline}
+    return tuple(
+        (getattr(ImageDraw.ImageDraw, method), args,
+         {key: inks.get(value, value) for key, value in options})
+        for method, args, options in part_shapes(part, part_type, size,
+                                                 walk_offset, bob_offset))
+
+
+def register_part(part, part_type):
+    """Register the geometry function of a part type.
+
+    The function takes ``(size, walk_offset, bob_offset)`` and returns a
+    list of shapes, usually built with filled(). A shape is a
+    ``(method, args, options)`` tuple: the name of an ImageDraw method,
+    its positional arguments and a tuple of ``(keyword, value)`` pairs,
+    where the values PART and OUTLINE stand for the part's colour and
+    the outline colour.
+
+    Registering or overriding a type clears the memoized shapes and
+    changes geometry_version(), so existing CharacterGenerators and
+    BatchRasterizers stop serving frames drawn with the old geometry.
+    Sprites already sent to browsers are cached by URL, so bump the web
+    app's SPRITE_VERSION after changing existing geometry; worker
+    processes only see registrations made before they start.
+    """
+    def register(geometry):
+        global _geometry_version
+        PART_TYPES[part][part_type] = geometry
+        _geometry_version += 1
+        part_shapes.cache_clear()
+        _inked_shapes.cache_clear()
+        return geometry
+    return register
+
+
+def filled(method, xy):
+    """Return a shape in the part's colour with a 1 pixel outline.
+
+    Args:
+        method (str): ImageDraw method, e.g. "rectangle" or "ellipse"
+        xy: The shape's box or points
+    """
+    return (method, (tuple(xy),),
+            (("fill", PART), ("outline", OUTLINE), ("width", 1)))
+
+
+def _head_box(size, bob_offset):
+    """Return the head's x, y and size."""
+    head_size = size // 4
+    return size // 2 - head_size // 2, size // 6 - bob_offset, head_size
+
+
+def _face(size, bob_offset):
+    """Return the eyes and mouth drawn on every head."""
+    head_x, head_y, head_size = _head_box(size, bob_offset)
+    eye_size = max(1, head_size // 8)
+    eye_y = head_y + head_size // 3
+    mouth_y = head_y + 2 * head_size // 3
+
+    eyes = [("ellipse", ((eye_x - eye_size, eye_y,
+                          eye_x + eye_size, eye_y + eye_size * 2),),
+             (("fill", OUTLINE),))
+            for eye_x in (head_x + head_size // 3,
+                          head_x + 2 * head_size // 3)]
+    mouth = ("arc", ((head_x + head_size // 4, mouth_y,
+                      head_x + 3 * head_size // 4, mouth_y + head_size // 4),
+                     0, 180),
+             (("fill", OUTLINE), ("width", 1)))
+    return eyes + [mouth]
+
+
+@register_part("head", "round")
+def _round_head(size, walk_offset, bob_offset):
+    x, y, head_size = _head_box(size, bob_offset)
+    return [filled("ellipse", (x, y, x + head_size, y + head_size))]
+
+
+@register_part("head", "square")
+def _square_head(size, walk_offset, bob_offset):
+    x, y, head_size = _head_box(size, bob_offset)
+    return [filled("rectangle", (x, y, x + head_size, y + head_size))]
+
+
+@register_part("head", "oval")
+def _oval_head(size, walk_offset, bob_offset):
+    x, y, head_size = _head_box(size, bob_offset)
+    return [filled("ellipse", (x, y, x + head_size, y + head_size + 4))]
+
+
+@register_part("head", "triangle")
+def _triangle_head(size, walk_offset, bob_offset):
+    x, y, head_size = _head_box(size, bob_offset)
+    return [filled("polygon", ((x + head_size // 2, y),
+                                (x, y + head_size),
+                                (x + head_size, y + head_size)))]
+
+
+def _body_box(size, bob_offset, width_scale=None):
+    """Return the body's box, optionally with a scaled width."""
+    body_width = size // 3
+    if width_scale is not None:
+        body_width = int(body_width * width_scale)
+    body_x = size // 2 - body_width // 2
+    body_y = size // 3 - bob_offset
+    return (body_x, body_y, body_x + body_width, body_y + size // 2)
+
+
+@register_part("body", "normal")
+def _normal_body(size, walk_offset, bob_offset):
+    return [filled("rectangle", _body_box(size, bob_offset))]
+
+
+@register_part("body", "muscular")
+def _muscular_body(size, walk_offset, bob_offset):
+    return [filled("rectangle", _body_box(size, bob_offset, 1.3))]
+
+
+@register_part("body", "slim")
+def _slim_body(size, walk_offset, bob_offset):
+    return [filled("rectangle", _body_box(size, bob_offset, 0.7))]
+
+
+@register_part("body", "round")
+def _round_body(size, walk_offset, bob_offset):
+    return [filled("ellipse", _body_box(size, bob_offset))]
+
+
+def _arm_pair(size, walk_offset, bob_offset, arm_width, arm_length):
+    """Return both arms, swinging in opposite directions.
+
+    The arms hang at the same place whatever their width.
+    """
+    left_x = size // 2 - size // 3 - size // 8
+    right_x = size // 2 + size // 3
+    arm_y = size // 3 + size // 12 - bob_offset
+    return [filled("rectangle", (x, arm_y + swing, x + arm_width,
+                                  arm_y + arm_length + swing))
+            for x, swing in ((left_x, walk_offset), (right_x, -walk_offset))]
+
+
+@register_part("arm", "normal")
+def _normal_arms(size, walk_offset, bob_offset):
+    return _arm_pair(size, walk_offset, bob_offset, size // 8, size // 3)
+
+
+@register_part("arm", "muscular")
+def _muscular_arms(size, walk_offset, bob_offset):
+    return _arm_pair(size, walk_offset, bob_offset,
+                     int(size // 8 * 1.5), size // 3)
+
+
+@register_part("arm", "thin")
+def _thin_arms(size, walk_offset, bob_offset):
+    return _arm_pair(size, walk_offset, bob_offset,
+                     max(1, int(size // 8 * 0.6)), size // 3)
+
+
+@register_part("arm", "long")
+def _long_arms(size, walk_offset, bob_offset):
+    return _arm_pair(size, walk_offset, bob_offset,
+                     size // 8, int(size // 3 * 1.3))
+
+
+def _leg_pair(size, walk_offset, leg_width, leg_length):
+    """Return both legs, stepping in opposite directions.
+
+    Legs are centred on their hip whatever their width; a step moves
+    only the foot.
+    """
+    leg_y = size // 2 + size // 6
+    return [filled("rectangle", (x, leg_y, x + leg_width,
+                                  leg_y + leg_length + step))
+            for x, step in ((size // 2 - size // 6 - leg_width // 2,
+                             walk_offset),
+                            (size // 2 + size // 6 - leg_width // 2,
+                             -walk_offset))]
+
+
+@register_part("leg", "normal")
+def _normal_legs(size, walk_offset, bob_offset):
+    return _leg_pair(size, walk_offset, size // 8, size // 3)
+
+
+@register_part("leg", "muscular")
+def _muscular_legs(size, walk_offset, bob_offset):
+    return _leg_pair(size, walk_offset, int(size // 8 * 1.5), size // 3)
+
+
+@register_part("leg", "thin")
+def _thin_legs(size, walk_offset, bob_offset):
+    return _leg_pair(size, walk_offset, max(1, int(size // 8 * 0.6)),
+                     size // 3)
+
+
+@register_part("leg", "long")
+def _long_legs(size, walk_offset, bob_offset):
+    return _leg_pair(size, walk_offset, size // 8, int(size // 3 * 1.3))
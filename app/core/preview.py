@@ -0,0 +1,147 @@
+"""Cheap encodings of sprite previews for the web UI.
+
+Previews have a handful of colours, so instead of RGBA PNGs at the
+default zlib level they are rendered straight into palette indices and
+sent either as a palette PNG with fast compression, or as raw 4bpp
+pixels plus a 16-entry palette for the browser to expand on a canvas.
+"""
+
+import base64
+import io
+from PIL import Image, ImageColor
+from .exporter import pack_4bpp
+from .generator import CHARACTER_DEFAULTS, OUTLINE_COLOR, ROLE_COLOR_FIELDS
+from .palette import get_palette
+
+# Preview encodings: the original RGBA PNG, a palette PNG, or raw pixels
+ENCODING_RGBA_PNG = "png"
+ENCODING_INDEXED_PNG = "indexed"
+ENCODING_RAW = "raw"
+
+# zlib level for preview PNGs; tiny images barely shrink at higher levels
+PREVIEW_COMPRESS_LEVEL = 1
+
+# Background entry candidates; at most five colours are in use, so one
+# of these is always free
+_KEY_COLORS = ("#FF00FF", "#00FF00", "#00FFFF", "#FF0000", "#0000FF",
+               "#FFFF00")
+
+
+def preview_palette(character_data):
+    """Return the exact palette of a character's preview.
+
+    Entry 0 is a key colour shown as transparent, followed by the
+    outline and every distinct part colour, so each pixel keeps its
+    exact RGB value. Colours are compared by RGB value, so "#f0f" and
+    "magenta" never leave "#FF00FF" free for the key.
+
+    Returns:
+        Palette: At most 6 entries
+    """
+    colors = [_normalized(OUTLINE_COLOR)]
+    for field in ROLE_COLOR_FIELDS:
+        color = _normalized(character_data.get(field,
+                                               CHARACTER_DEFAULTS[field]))
+        if color not in colors:
+            colors.append(color)
+    key = next(color for color in _KEY_COLORS if color not in colors)
+    return get_palette([key] + colors)
+
+
+def _normalized(color):
+    """Return a colour as "#RRGGBB"."""
+    return "#%02X%02X%02X" % ImageColor.getrgb(color)[:3]
+
+
+def render_preview(generator, character_data, frame=0):
+    """Render one frame in preview palette indices.
+
+    Args:
+        generator (CharacterGenerator): Generator to render with
+        character_data (dict): Character specification
+        frame (int): Animation frame number
+
+    Returns:
+        PIL.Image: "P" mode frame, index 0 transparent
+    """
+    palette = preview_palette(character_data)
+    return generator.generate_indexed(character_data, palette, frame)
+
+
+def render_preview_strip(generator, character_data):
+    """Render every frame in preview palette indices, left to right."""
+    palette = preview_palette(character_data)
+    frame_count = max(1, character_data.get("animation_frames", 1))
+    frames = [generator.generate_indexed(character_data, palette, frame)
+              for frame in range(frame_count)]
+    width, height = frames[0].size
+    strip = Image.new("P", (width * len(frames), height), 0)
+    strip.putpalette(palette.flat)
+    for i, frame in enumerate(frames):
+        strip.paste(frame, (i * width, 0))
+    return strip
+
+
+def encode_png(image, compress_level=PREVIEW_COMPRESS_LEVEL):
+    """Encode a preview as PNG.
+
+    "P" previews (at most 16 colours) are stored at 4 bits per pixel
+    with a 16-entry palette and index 0 transparent; a full 256-entry
+    palette alone would outweigh the pixel data.
+    """
+    buffer = io.BytesIO()
+    if image.mode == "P":
+        image.save(buffer, format="PNG", compress_level=compress_level,
+                   bits=4, transparency=0)
+    else:
+        image.save(buffer, format="PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+def encode_raw(image):
+    """Encode a preview as raw 4bpp pixels plus its palette.
+
+    Pixels are packed in row-major order as one continuous stream, two
+    per byte, high nibble first. Index 0 is transparent.
+
+    Args:
+        image (PIL.Image): "P" mode preview with at most 16 colours
+
+    Returns:
+        dict: ``width``, ``height``, ``palette`` ("#RRGGBB" strings) and
+        base64 ``pixels``
+    """
+    palette = image.getpalette()[:48]
+    return {
+        "width": image.width,
+        "height": image.height,
+        "palette": ["#%02X%02X%02X" % tuple(palette[i:i + 3])
+                    for i in range(0, len(palette), 3)],
+        "pixels": base64.b64encode(pack_4bpp(image.tobytes())).decode(),
+    }
+
+
+def encode_preview(image, encoding=ENCODING_INDEXED_PNG):
+    """Encode a preview for JSON transport.
+
+    Args:
+        image (PIL.Image): RGBA image for ENCODING_RGBA_PNG, otherwise a
+            "P" preview from render_preview
+        encoding (str): ENCODING_RGBA_PNG, ENCODING_INDEXED_PNG or
+            ENCODING_RAW
+
+    Returns:
+        A PNG data URL, or the raw pixel dict
+    """
+    if encoding == ENCODING_RAW:
+        return encode_raw(image)
+    if encoding == ENCODING_INDEXED_PNG:
+        png = encode_png(image)
+    elif encoding == ENCODING_RGBA_PNG:
+        # The original preview encoding, kept for comparison
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        png = buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown preview encoding: {encoding}")
+    return "data:image/png;base64," + base64.b64encode(png).decode()
@@ -0,0 +1,77 @@
+"""Bounded worker pool for CPU-bound rendering in the web server."""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RenderPoolBusy(RuntimeError):
+    """Raised when a job is submitted while the pool's queue is full."""
+
+
+class RenderPool:
+    """Thread pool with a hard limit on queued plus running jobs.
+
+    Request threads hand rendering to the pool and wait for the result,
+    so at most ``workers`` renders compete for the CPU however many
+    requests are open. Once ``max_pending`` jobs are in flight new jobs
+    are refused immediately instead of queueing without bound, which
+    lets the server answer "try again" while it is still responsive.
+    """
+
+    def __init__(self, workers=None, max_pending=32):
+        """Create a render pool.
+
+        Args:
+            workers (int): Rendering threads (default: CPU count)
+            max_pending (int): Jobs allowed in flight before refusing more
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="sgdk-render")
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return its future.
+
+        Raises:
+            RenderPoolBusy: If ``max_pending`` jobs are already in flight
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise RenderPoolBusy("Render queue is full")
+            self.pending += 1
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the pool and return its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self):
+        """Return pool size, jobs in flight and refused job count."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=wait)
+
+    def _release(self, future=None):
+        with self._lock:
+            self.pending -= 1
@@ -0,0 +1,63 @@
+"""Coalescing of identical concurrent calls."""
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Runs a call once for every caller asking for the same key at once.
+
+    The first caller for a key runs the function; callers arriving while
+    it is still running wait for and share its result (or exception)
+    instead of repeating the work. Nothing is cached once the call ends.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing any in-flight call for key.
+
+        Args:
+            key: Hashable identity of the call's result
+            fn (callable): Work to run if no call for key is in flight
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        """Return calls made, calls shared and calls currently in flight."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+            }
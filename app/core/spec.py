@@ -0,0 +1,158 @@
+"""Validated, immutable character specifications."""
+
+import sys
+from collections.abc import Mapping
+from PIL import ImageColor
+from .generator import CHARACTER_DEFAULTS, character_digest
+from .parts import PART_TYPES
+
+# Ranges offered by the editor; values outside them are clamped
+SIZE_MIN = 16
+SIZE_MAX = 64
+FRAMES_MIN = 1
+FRAMES_MAX = 8
+
+FIELDS = tuple(CHARACTER_DEFAULTS)
+_FIELD_SET = frozenset(FIELDS)
+_PART_FIELDS = {"head_type": "head", "body_type": "body",
+                "arm_type": "arm", "leg_type": "leg"}
+
+
+class CharacterSpec(Mapping):
+    """Immutable character specification with its digest computed once.
+
+    Every field is validated on construction: part types must be
+    registered in the part registry (and are interned), colours must
+    parse, and ``size`` and ``animation_frames`` are clamped to the
+    editor's ranges. A spec is a read-only mapping of its fields, so it
+    can be passed anywhere a character dict is accepted, and
+    character_digest() returns its precomputed ``digest``.
+    """
+
+    __slots__ = FIELDS + ("digest", "_hash")
+
+    def __init__(self, **fields):
+        """Create a spec; missing fields take their defaults.
+
+        Raises:
+            ValueError: If a field is unknown or has an invalid value
+        """
+        unknown = set(fields) - _FIELD_SET
+        if unknown:
+            raise ValueError("Unknown character fields: "
+                             + ", ".join(sorted(unknown)))
+
+        set_attr = object.__setattr__
+        for field in FIELDS:
+            value = fields.get(field, CHARACTER_DEFAULTS[field])
+            if field in _PART_FIELDS:
+                value = _part_type(field, value)
+            elif field.endswith("_color"):
+                value = _color(field, value)
+            elif field == "size":
+                value = _clamped(field, value, SIZE_MIN, SIZE_MAX)
+            else:
+                value = _clamped(field, value, FRAMES_MIN, FRAMES_MAX)
+            set_attr(self, field, value)
+
+        digest = character_digest(self.to_dict())
+        set_attr(self, "digest", digest)
+        set_attr(self, "_hash", hash(digest))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a spec from a character dict, ignoring unrelated keys.
+
+        Args:
+            data (dict): Character specification, e.g. request JSON; a
+                CharacterSpec is returned as is
+
+        Returns:
+            CharacterSpec: The validated spec
+
+        Raises:
+            ValueError: If a field has an invalid value
+        """
+        if isinstance(data, cls):
+            return data
+        if not isinstance(data, Mapping):
+            raise ValueError("Character data must be an object")
+        return cls(**{field: data[field] for field in FIELDS if field in data})
+
+    def to_dict(self):
+        """Return the fields as a plain dict, e.g. for JSON."""
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def get(self, key, default=None):
+        # Faster than Mapping.get, which goes through __getitem__
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CharacterSpec is immutable")
+
+    def __eq__(self, other):
+        if isinstance(other, CharacterSpec):
+            return self.digest == other.digest
+        return NotImplemented
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (_from_fields, (self.to_dict(),))
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}"
+                           for field in FIELDS)
+        return f"CharacterSpec({fields})"
+
+
+def _from_fields(fields):
+    """Rebuild an unpickled spec."""
+    return CharacterSpec(**fields)
+
+
+def _part_type(field, value):
+    """Validate a part type against the registry and intern it."""
+    if (not isinstance(value, str)
+            or value not in PART_TYPES[_PART_FIELDS[field]]):
+        raise ValueError(f"Unknown {field}: {value!r}")
+    return sys.intern(value)
+
+
+def _color(field, value):
+    """Validate a colour, normalised to upper case like the digest."""
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid {field}: {value!r}")
+    try:
+        ImageColor.getrgb(value)
+    except ValueError:
+        raise ValueError(f"Invalid {field}: {value!r}") from None
+    return value.upper()
+
+
+def _clamped(field, value, low, high):
+    """Return an integer field clamped to [low, high]."""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid {field}: {value!r}")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: {value!r}") from None
+    return min(max(value, low), high)
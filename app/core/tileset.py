@@ -0,0 +1,96 @@
+"""Tile set builder that removes duplicate and flipped tiles."""
+
+# Size of one packed 4bpp 8x8 tile
+TILE_BYTES = 32
+
+# Flip bits and index mask of a Mega Drive tile attribute word
+TILE_ATTR_HFLIP = 0x0800
+TILE_ATTR_VFLIP = 0x1000
+TILE_INDEX_MASK = 0x07FF
+# Palette line (0-3) of a tile attribute word is stored in bits 13-14
+TILE_ATTR_PALETTE_SHIFT = 13
+
+# Swaps the two pixels packed into a 4bpp byte
+_NIBBLE_SWAP = bytes(((i & 0x0F) << 4) | (i >> 4) for i in range(256))
+
+
+def vflip_tile(tile):
+    """Mirror a packed 4bpp tile vertically (reverse its 4-byte rows)."""
+    return b"".join(tile[row:row + 4] for row in range(TILE_BYTES - 4, -4, -4))
+
+
+def hflip_tile(tile):
+    """Mirror a packed 4bpp tile horizontally."""
+    # Reversing every byte flips both axes; undo the vertical part
+    return vflip_tile(tile[::-1].translate(_NIBBLE_SWAP))
+
+
+def split_tiles(data):
+    """Split packed tile data into a list of 32-byte tiles."""
+    return [data[i:i + TILE_BYTES] for i in range(0, len(data), TILE_BYTES)]
+
+
+class TileSet:
+    """Collection of unique 8x8 tiles shared by any number of frames.
+
+    Each added tile is matched against every tile already in the set,
+    including their horizontally, vertically and doubly flipped versions.
+    Adding a tile returns a tile attribute word: the tile index plus the
+    flip bits needed to reproduce the original tile.
+    """
+
+    def __init__(self, use_flips=True):
+        self.use_flips = use_flips
+        self.tiles = []
+        self.tiles_added = 0
+        self._lookup = {}
+
+    def add(self, tile):
+        """Add one 32-byte tile and return its tile attribute word."""
+        self.tiles_added += 1
+        attr = self._lookup.get(tile)
+        if attr is not None:
+            return attr
+
+        index = len(self.tiles)
+        if index > TILE_INDEX_MASK:
+            raise ValueError("Tile set exceeds 2048 tiles")
+        self.tiles.append(tile)
+
+        # Register every orientation up front so later lookups are a
+        # single dict hit; symmetric tiles keep their unflipped entry
+        self._lookup[tile] = index
+        if self.use_flips:
+            hflipped = hflip_tile(tile)
+            self._lookup.setdefault(hflipped, index | TILE_ATTR_HFLIP)
+            self._lookup.setdefault(vflip_tile(tile), index | TILE_ATTR_VFLIP)
+            self._lookup.setdefault(vflip_tile(hflipped),
+                                    index | TILE_ATTR_HFLIP | TILE_ATTR_VFLIP)
+        return index
+
+    def add_frame(self, data):
+        """Add tile-ordered frame data and return its tile attribute map."""
+        return [self.add(tile) for tile in split_tiles(data)]
+
+    def data(self):
+        """Return all unique tiles as one packed byte string."""
+        return b"".join(self.tiles)
+
+    def resolve(self, attr):
+        """Return the tile an attribute word refers to, flips applied."""
+        tile = self.tiles[attr & TILE_INDEX_MASK]
+        if attr & TILE_ATTR_HFLIP:
+            tile = hflip_tile(tile)
+        if attr & TILE_ATTR_VFLIP:
+            tile = vflip_tile(tile)
+        return tile
+
+    def stats(self):
+        """Return tile counts before and after deduplication."""
+        return {
+            "tiles": self.tiles_added,
+            "unique_tiles": len(self.tiles),
+        }
+
+    def __len__(self):
+        return len(self.tiles)
@@ -0,0 +1,53 @@
+"""Process pool shared by the batch and bank exporters."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .exporter import SGDKExporter
+
+# Exporter owned by each worker process, created by _init_worker
+_worker_exporter = None
+
+
+def _init_worker():
+    """Create the exporter used by this worker process."""
+    global _worker_exporter
+    _worker_exporter = SGDKExporter()
+
+
+def worker_exporter():
+    """Return the exporter of the current worker process."""
+    return _worker_exporter
+
+
+def pool_size(workers, job_count):
+    """Return the worker processes to start for job_count jobs.
+
+    Args:
+        workers (int): Requested workers (default: CPU count)
+        job_count (int): Number of jobs
+
+    Returns:
+        int: At least 1, and no more than there are jobs
+    """
+    return max(1, min(workers or os.cpu_count() or 1, job_count or 1))
+
+
+def map_in_workers(function, jobs, workers):
+    """Run function over jobs in worker processes, in input order.
+
+    Each worker owns one SGDKExporter, available to function through
+    worker_exporter(). Results are yielded as they become available.
+
+    Args:
+        function (callable): Picklable function taking one job
+        jobs (list): Picklable jobs
+        workers (int): Worker processes, e.g. from pool_size
+
+    Yields:
+        The result of every job
+    """
+    # Hand out several jobs at a time so IPC does not dominate tiny jobs
+    chunksize = max(1, min(32, len(jobs) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker) as executor:
+        yield from executor.map(function, jobs, chunksize=chunksize)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Batch export of character specifications to SGDK format.
+
+Usage:
+    python batch_export.py characters/ -o sgdk_out
+    python batch_export.py npcs.jsonl -o sgdk_out --workers 8 --layout tiles
+    python batch_export.py npcs.jsonl -o res --format binary
+    python batch_export.py enemies/ -o sgdk_out --bank level1
+"""
+
+import argparse
+import os
+import sys
+from app.core.bank import BankExporter
+from app.core.batch import export_batch, load_specs
+from app.core.csource import c_name
+from app.core.exporter import (COMPRESSION_APLIB, LAYOUT_LINEAR, LAYOUT_TILES,
+                               OUTPUT_BINARY, OUTPUT_C)
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Export many characters to SGDK format in parallel.")
+    parser.add_argument("source",
+                        help="directory of .json files or a .jsonl file")
+    parser.add_argument("-o", "--output-dir", default="sgdk_output",
+                        help="output directory (default: sgdk_output)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--layout", choices=[LAYOUT_LINEAR, LAYOUT_TILES],
+                        default=None,
+                        help=f"sprite data layout (default: {LAYOUT_LINEAR})")
+    parser.add_argument("--dedupe-tiles", action="store_true",
+                        help="emit a deduplicated tile set per character")
+    parser.add_argument("--compression", choices=[COMPRESSION_APLIB],
+                        default=None, help="compress sprite data")
+    parser.add_argument("--format", choices=[OUTPUT_C, OUTPUT_BINARY],
+                        default=None, dest="output_format",
+                        help="C arrays (default), or .bin files plus a "
+                             "rescomp .res")
+    parser.add_argument("--bank", metavar="NAME",
+                        help="export every character into one bank NAME.c/.h "
+                             "with shared tiles and palettes")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="only print the summary")
+    args = parser.parse_args(argv)
+
+    if args.bank:
+        # A bank is always deduplicated tiles in C source, uncompressed
+        ignored = [option for option, given in (
+            ("--layout", args.layout is not None),
+            ("--dedupe-tiles", args.dedupe_tiles),
+            ("--compression", args.compression is not None),
+            ("--format", args.output_format is not None)) if given]
+        if ignored:
+            parser.error(f"{', '.join(ignored)} cannot be used with --bank")
+    if args.layout is None:
+        args.layout = LAYOUT_LINEAR
+    if args.output_format is None:
+        args.output_format = OUTPUT_C
+    return args
+
+
+def export_bank(specs, load_failures, args):
+    """Export all specs as one bank and print its statistics.
+
+    Characters are validated as CharacterSpecs by the bank exporter.
+    """
+    if load_failures:
+        # A bank is all or nothing, so any unreadable character fails it
+        for name, error in load_failures:
+            print(f"  failed: {name}: {error}", file=sys.stderr)
+        print("Bank export failed: some characters could not be loaded",
+              file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    # Sanitised like character names, so the bank stays in the output dir
+    output_path = os.path.join(args.output_dir, c_name(args.bank) + ".c")
+    try:
+        stats = BankExporter(args.workers).export_bank(specs, output_path)
+    except Exception as e:
+        # A bank is all or nothing, so any bad character fails the export
+        print(f"Bank export failed: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Exported {stats['characters']} characters to '{output_path}' "
+          f"in {stats['elapsed']:.2f}s: {stats['unique_tiles']}/"
+          f"{stats['tiles']} tiles after deduplication, "
+          f"{stats['palette_lines']} palette lines")
+    if not args.quiet:
+        for line in stats["palette_report"]:
+            print(f"  PAL{line['line']}: {len(line['colors'])} colours, "
+                  f"{', '.join(line['characters'])}")
+    return 0
+
+
+def main(argv=None):
+    """Run the batch export and print a summary."""
+    args = parse_args(argv)
+    try:
+        specs, load_failures = load_specs(args.source)
+    except OSError as e:
+        print(f"Cannot read '{args.source}': {e.strerror or e}",
+              file=sys.stderr)
+        return 1
+
+    if args.bank:
+        return export_bank(specs, load_failures, args)
+
+    def progress(done, total, name, error):
+        if error:
+            print(f"[{done}/{total}] {name}: FAILED ({error})", file=sys.stderr)
+        elif not args.quiet:
+            print(f"[{done}/{total}] {name}")
+
+    summary = export_batch(specs, args.output_dir, args.workers, progress,
+                           load_failures, layout=args.layout,
+                           dedupe_tiles=args.dedupe_tiles,
+                           compression=args.compression,
+                           output_format=args.output_format)
+
+    print(f"Exported {summary['exported']}/{summary['total']} characters "
+          f"to '{args.output_dir}' in {summary['elapsed']:.2f}s "
+          f"({summary['per_second']:.1f} characters/s, "
+          f"{summary['workers']} workers)")
+    for name, error in summary["failures"]:
+        print(f"  failed: {name}: {error}", file=sys.stderr)
+
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
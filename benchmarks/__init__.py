@@ -0,0 +1,5 @@
+"""Benchmarks for the generator, exporter and web endpoints.
+
+Run with ``python -m benchmarks`` from the repository root; see
+``python -m benchmarks --help`` for options.
+"""
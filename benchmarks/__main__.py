@@ -0,0 +1,119 @@
+"""Command-line runner for the benchmark suite.
+
+Usage:
+    python -m benchmarks
+    python -m benchmarks --quick --filter exporter --json after.json
+    python -m benchmarks --json after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import PIL
+from .cases import CASES
+from .harness import measure
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the generator, exporter and web endpoints.")
+    parser.add_argument("-k", "--filter", default="",
+                        help="only run cases whose name contains this text")
+    parser.add_argument("-n", "--iterations", type=int, default=200,
+                        help="timed iterations per case (default: 200)")
+    parser.add_argument("--quick", action="store_true",
+                        help="30 iterations per case, for smoke runs")
+    parser.add_argument("--json", metavar="PATH",
+                        help="write results as JSON to PATH")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="compare p50 latency against an earlier JSON run")
+    parser.add_argument("--list", action="store_true",
+                        help="list case names and exit")
+    return parser.parse_args(argv)
+
+
+def _git_revision():
+    """Current git commit, or None outside a repository."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Run the selected cases and return the JSON-serialisable report."""
+    iterations = 30 if args.quick else args.iterations
+    results = {}
+
+    for name, factory in CASES:
+        if args.filter not in name:
+            continue
+        operation = factory()
+        if operation is None:
+            print(f"{name:<64} skipped", file=sys.stderr)
+            continue
+        result = measure(operation, iterations)
+        results[name] = result
+        print(f"{name:<64} p50 {result['p50_us']:>10.1f}us  "
+              f"p99 {result['p99_us']:>10.1f}us  "
+              f"{result['ops_per_sec']:>10.1f} ops/s  "
+              f"peak {result['peak_memory_bytes'] / 1024:>8.1f} KiB")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": PIL.__version__,
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    """Print p50 latency changes relative to a baseline report."""
+    print(f"\nComparison with {baseline['meta'].get('git_revision')} "
+          "(p50, new / old):")
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            print(f"{name:<64} new")
+            continue
+        ratio = result["p50_us"] / previous["p50_us"]
+        print(f"{name:<64} {previous['p50_us']:>10.1f}us -> "
+              f"{result['p50_us']:>10.1f}us  x{ratio:.2f}")
+
+
+def main(argv=None):
+    """Entry point for ``python -m benchmarks``."""
+    args = parse_args(argv)
+
+    if args.list:
+        for name, _ in CASES:
+            print(name)
+        return 0
+
+    report = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Benchmark cases for the hot paths of the character pipeline.
+
+Each case is registered with a name and a factory. The factory does all
+setup and returns the zero-argument operation to time, or None when the
+case cannot run here (for example Flask is not installed).
+"""
+
+import io
+import itertools
+import os
+import tempfile
+from app.core.exporter import LAYOUT_LINEAR, LAYOUT_TILES, SGDKExporter
+from app.core.generator import CharacterGenerator
+from app.core.preview import (ENCODING_INDEXED_PNG, ENCODING_RAW,
+                              ENCODING_RGBA_PNG, encode_preview,
+                              render_preview)
+from app.core.raster import BatchRasterizer
+from app.core.spec import CharacterSpec
+from .harness import cycle
+
+HEAD_TYPES = ["round", "square", "oval", "triangle"]
+BODY_TYPES = ["normal", "muscular", "slim", "round"]
+ARM_TYPES = ["normal", "muscular", "thin", "long"]
+LEG_TYPES = ["normal", "muscular", "thin", "long"]
+
+SIZES = (16, 24, 32, 48, 64)
+EXPORT_SIZES = (32, 64)
+ANIMATION_FRAMES = 4
+
+CASES = []
+
+
+def case(name):
+    """Register a benchmark factory under name."""
+    def register(factory):
+        CASES.append((name, factory))
+        return factory
+    return register
+
+
+def character_specs(size, animation_frames=ANIMATION_FRAMES):
+    """Every head/body/arm/leg combination at the given size."""
+    return [
+        {
+            "head_type": head_type,
+            "body_type": body_type,
+            "arm_type": arm_type,
+            "leg_type": leg_type,
+            "head_color": "#FFDDAA",
+            "body_color": "#0066CC",
+            "arm_color": "#DDAA88",
+            "leg_color": "#664422",
+            "size": size,
+            "animation_frames": animation_frames,
+        }
+        for head_type, body_type, arm_type, leg_type in itertools.product(
+            HEAD_TYPES, BODY_TYPES, ARM_TYPES, LEG_TYPES)
+    ]
+
+
+def uncached_exporter():
+    """Exporter whose generator renders every frame from scratch."""
+    exporter = SGDKExporter()
+    exporter.generator = CharacterGenerator(cache_size=0, role_cache_size=0)
+    return exporter
+
+
+def _frame_jobs(size):
+    """(spec, frame) pairs covering every combination and frame."""
+    return [(spec, frame) for spec in character_specs(size)
+            for frame in range(ANIMATION_FRAMES)]
+
+
+def _register_generator_cases(size):
+    @case(f"generator.generate_character.uncached[size={size}]")
+    def uncached():
+        generator = CharacterGenerator(cache_size=0, role_cache_size=0)
+        next_job = cycle(_frame_jobs(size))
+        return lambda: generator.generate_character(*next_job())
+
+    @case(f"generator.generate_character.recolor[size={size}]")
+    def recolor():
+        # Colour edits: every frame is new, but its role map is cached
+        generator = CharacterGenerator(cache_size=0)
+        colors = ["#FFDDAA", "#0066CC", "#DDAA88", "#664422", "#AA2222"]
+        jobs = [({**spec, "head_color": color}, frame)
+                for spec, frame in _frame_jobs(size)[:8 * ANIMATION_FRAMES]
+                for color in colors]
+        for job in jobs:
+            generator.generate_character(*job)
+        next_job = cycle(jobs)
+        return lambda: generator.generate_character(*next_job())
+
+    @case(f"generator.generate_character.cached[size={size}]")
+    def cached():
+        # Animation playback: a few characters cycling through their frames
+        jobs = _frame_jobs(size)[:8 * ANIMATION_FRAMES]
+        generator = CharacterGenerator()
+        for job in jobs:
+            generator.generate_character(*job)
+        next_job = cycle(jobs)
+        return lambda: generator.generate_character(*next_job())
+
+    @case(f"generator.generate_character.cached_spec[size={size}]")
+    def cached_spec():
+        # As cached, with digests precomputed by CharacterSpec
+        jobs = [(CharacterSpec.from_dict(spec), frame)
+                for spec, frame in _frame_jobs(size)[:8 * ANIMATION_FRAMES]]
+        generator = CharacterGenerator()
+        for job in jobs:
+            generator.generate_character(*job)
+        next_job = cycle(jobs)
+        return lambda: generator.generate_character(*next_job())
+
+
+def _register_exporter_cases(size):
+    @case(f"exporter._convert_to_indexed[size={size}]")
+    def convert_to_indexed():
+        exporter = uncached_exporter()
+        jobs = []
+        for spec in character_specs(size):
+            palette = exporter._create_megadrive_palette(spec)
+            jobs.append((exporter.generator.generate_character(spec, 1),
+                         palette))
+        next_job = cycle(jobs)
+        return lambda: exporter._convert_to_indexed(*next_job())
+
+    for layout in (LAYOUT_LINEAR, LAYOUT_TILES):
+        @case(f"exporter._generate_sprite_data[size={size},layout={layout}]")
+        def generate_sprite_data(layout=layout):
+            exporter = uncached_exporter()
+            frame_sets = [exporter._render_indexed_frames(spec)[1]
+                          for spec in character_specs(size)]
+            next_frames = cycle(frame_sets)
+            return lambda: exporter._generate_sprite_data(next_frames(), size,
+                                                          layout)
+
+    @case(f"exporter._write_c_file[size={size}]")
+    def write_c_file():
+        exporter = uncached_exporter()
+        jobs = []
+        for spec in character_specs(size)[:32]:
+            palette, frames = exporter._render_indexed_frames(spec)
+            jobs.append((exporter._generate_sprite_data(frames, size),
+                         exporter._generate_palette_data(palette)))
+        next_job = cycle(jobs)
+
+        def operation():
+            sprite_data, palette_data = next_job()
+            exporter._write_c_file(io.StringIO(), "bench", sprite_data,
+                                   palette_data, size, ANIMATION_FRAMES)
+        return operation
+
+    @case(f"exporter.export_to_memory[size={size}]")
+    def export_to_memory():
+        exporter = uncached_exporter()
+        next_spec = cycle(character_specs(size))
+        return lambda: exporter.export_to_memory(next_spec(), "bench")
+
+    @case(f"exporter.export_character[size={size}]")
+    def export_character():
+        exporter = uncached_exporter()
+        next_spec = cycle(character_specs(size))
+        # Kept alive by the closure for the duration of the benchmark
+        output_dir = tempfile.TemporaryDirectory(prefix="sgdk_bench_")
+        output_path = os.path.join(output_dir.name, "bench.c")
+
+        def operation(output_dir=output_dir):
+            exporter.export_character(next_spec(), output_path)
+        return operation
+
+    @case(f"exporter.export_variants[size={size},variants=64]")
+    def export_variants():
+        exporter = uncached_exporter()
+        next_spec = cycle(character_specs(size))
+        variants = [{"body_color": "#%02X%02X%02X" % (i * 4, 255 - i * 4, 128)}
+                    for i in range(64)]
+        return lambda: exporter.export_variants(next_spec(), variants, "bench")
+
+
+def _register_preview_cases(size):
+    for encoding in (ENCODING_RGBA_PNG, ENCODING_INDEXED_PNG, ENCODING_RAW):
+        @case(f"preview.encode_preview[size={size},encoding={encoding}]")
+        def encode(encoding=encoding):
+            # Encoding only: frames are rendered up front
+            generator = CharacterGenerator(cache_size=0)
+            jobs = _frame_jobs(size)[:64]
+            if encoding == ENCODING_RGBA_PNG:
+                images = [generator.generate_character(*job) for job in jobs]
+            else:
+                images = [render_preview(generator, *job) for job in jobs]
+            next_image = cycle(images)
+            return lambda: encode_preview(next_image(), encoding)
+
+
+def _register_raster_cases(size):
+    @case(f"raster.generate_many[size={size},characters=256]")
+    def generate_many():
+        try:
+            rasterizer = BatchRasterizer()
+        except ImportError:
+            # NumPy is not installed
+            return None
+        exporter = SGDKExporter()
+        specs = character_specs(size)
+        palettes = [exporter._create_megadrive_palette(spec)
+                    for spec in specs]
+        return lambda: rasterizer.generate_many(specs, palettes)
+
+
+for _size in SIZES:
+    _register_generator_cases(_size)
+for _size in EXPORT_SIZES:
+    _register_exporter_cases(_size)
+for _size in EXPORT_SIZES:
+    _register_preview_cases(_size)
+for _size in EXPORT_SIZES:
+    _register_raster_cases(_size)
+
+
+def _web_client():
+    """Flask test client for web_app, or None if Flask is unavailable."""
+    try:
+        import web_app
+    except ImportError:
+        return None
+    return web_app.app.test_client()
+
+
+@case("web./api/generate")
+def web_generate():
+    client = _web_client()
+    if client is None:
+        return None
+    next_job = cycle(_frame_jobs(32))
+
+    def operation():
+        spec, frame = next_job()
+        response = client.post("/api/generate", json={**spec, "frame": frame})
+        assert response.status_code == 200
+        # Errors are also answered with 200, so check the payload too
+        payload = response.get_json()
+        assert payload["success"], payload.get("error")
+        assert payload["image"]
+    return operation
+
+
+@case("web./api/export")
+def web_export():
+    client = _web_client()
+    if client is None:
+        return None
+    next_spec = cycle(character_specs(32))
+
+    def operation():
+        response = client.post("/api/export",
+                               json={**next_spec(), "name": "bench"})
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert payload["success"], payload.get("error")
+        assert payload["files"]["c_file"] and payload["files"]["h_file"]
+    return operation
+
@@ -0,0 +1,84 @@
+"""Timing and memory measurement helpers for the benchmark suite."""
+
+import gc
+import statistics
+import time
+import tracemalloc
+
+
+def _percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of already sorted values."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def measure(operation, iterations, warmup=3, memory_iterations=5):
+    """Benchmark a zero-argument callable.
+
+    Latencies are taken without tracing; peak memory is measured in a
+    separate, shorter pass under tracemalloc so tracing overhead does not
+    distort the timings.
+
+    Args:
+        operation (callable): Operation to measure
+        iterations (int): Timed calls
+        warmup (int): Untimed calls made first
+        memory_iterations (int): Calls made under tracemalloc
+
+    Returns:
+        dict: Latency statistics in microseconds, operations per second
+        and peak traced memory in bytes
+    """
+    for _ in range(warmup):
+        operation()
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            op_started = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - op_started)
+        total = time.perf_counter() - started
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    to_us = 1e6
+    return {
+        "iterations": iterations,
+        "mean_us": statistics.fmean(timings) * to_us,
+        "p50_us": _percentile(timings, 0.50) * to_us,
+        "p90_us": _percentile(timings, 0.90) * to_us,
+        "p99_us": _percentile(timings, 0.99) * to_us,
+        "max_us": timings[-1] * to_us,
+        "ops_per_sec": iterations / total if total else 0.0,
+        "peak_memory_bytes": peak,
+    }
+
+
+def cycle(items):
+    """Return a callable that yields the next item of items on every call."""
+    state = {"index": -1}
+
+    def next_item():
+        state["index"] = (state["index"] + 1) % len(items)
+        return items[state["index"]]
+
+    return next_item
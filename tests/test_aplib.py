@@ -0,0 +1,53 @@
+"""Round-trip tests for the aPLib compressor."""
+
+import random
+import pytest
+from app.core import aplib
+
+
+def _random_bytes(seed, length):
+    rng = random.Random(seed)
+    return bytes(rng.randrange(256) for _ in range(length))
+
+
+def _far_repeat(distance, repeat=True):
+    """A block repeated ``distance`` bytes later, across random filler.
+
+    Without ``repeat`` the second block is different random bytes.
+    """
+    block = _random_bytes("block", 300)
+    last = block if repeat else _random_bytes("other", len(block))
+    return block + _random_bytes(distance, distance - len(block)) + last
+
+
+CASES = {
+    "empty": b"",
+    "one byte": b"\x2a",
+    "zero run": bytes(5000),
+    "byte run": b"\x11" * 70000,
+    "pattern": b"\x12\x34\x00\x00" * 2000,
+    # Matches longer than their offset copy bytes they are still writing
+    "overlapping copy": b"abc" + b"abc" * 500 + b"xyz" * 3,
+    "nibble tiles": bytes(random.Random(1).choice((0x00, 0x11, 0x12, 0x21))
+                          for _ in range(8192)),
+    "random": _random_bytes(2, 4096),
+    "offset 1280": _far_repeat(1280),
+    "offset 32000": _far_repeat(32000),
+    "offset 40000": _far_repeat(40000),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_round_trip(name):
+    data = CASES[name]
+
+    assert aplib.decompress(aplib.compress(data)) == data
+
+
+@pytest.mark.parametrize("distance", [1280, 32000, 40000])
+def test_far_repeat_is_encoded_as_a_match(distance):
+    repeated = aplib.compress(_far_repeat(distance))
+    unrelated = aplib.compress(_far_repeat(distance, repeat=False))
+
+    # The repeated block costs a few bytes instead of its 300 literals
+    assert len(repeated) < len(unrelated) - 250
@@ -0,0 +1,135 @@
+"""Tests for multi-character sprite banks."""
+
+import re
+import pytest
+from app.core.bank import BankExporter
+from app.core.exporter import LAYOUT_TILES, SGDKExporter, pack_sprite_frames
+from app.core.palette_alloc import allocate_palettes, snap_character
+from app.core.tileset import (TILE_ATTR_HFLIP, TILE_ATTR_VFLIP,
+                              TILE_INDEX_MASK, hflip_tile, split_tiles,
+                              vflip_tile)
+
+# Four distinct colours each, so the five need two palette lines
+COLORS = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF",
+          "#00FFFF", "#FF8800", "#8800FF", "#0088FF", "#88FF00",
+          "#FF0088", "#00FF88", "#884400", "#448800", "#004488",
+          "#880044", "#448844", "#884488", "#448888", "#888844"]
+CHARACTERS = [
+    (f"npc{n}", {"head_color": COLORS[4 * n],
+                 "body_color": COLORS[4 * n + 1],
+                 "arm_color": COLORS[4 * n + 2],
+                 "leg_color": COLORS[4 * n + 3],
+                 "size": 24, "animation_frames": 2})
+    for n in range(5)
+]
+
+
+def c_array(source, name):
+    """Return the values of a C array of hex literals."""
+    body = re.search(rf"\b{name}\[\d*\] = {{(.*?)}};", source, re.S).group(1)
+    return [int(value, 16) for value in re.findall(r"0x[0-9A-F]+", body)]
+
+
+@pytest.fixture(scope="module")
+def bank():
+    return BankExporter(workers=1).export_to_memory(CHARACTERS, "bank")
+
+
+def test_map_words_carry_palette_line_and_resolve_to_frames(bank):
+    c_file = bank["c_file"]
+    tiles = split_tiles(bytes(c_array(c_file, "bank_tiles")))
+    maps = c_array(c_file, "bank_maps")
+    offsets = c_array(c_file, "bank_map_offset") + [len(maps)]
+    first_frames = c_array(c_file, "bank_first_frame")
+    lines = c_array(c_file, "bank_palette_line")
+    allocation = allocate_palettes([data for _, data in CHARACTERS])
+    generator = SGDKExporter().generator
+
+    assert sorted(set(lines)) == [0, 1]
+    for n, (_, data) in enumerate(CHARACTERS):
+        palette = allocation.palette(lines[n])
+        frames = [generator.generate_indexed(snap_character(data), palette,
+                                             frame) for frame in range(2)]
+        expected = pack_sprite_frames(frames, LAYOUT_TILES)
+        for frame in range(2):
+            index = first_frames[n] + frame
+            words = maps[offsets[index]:offsets[index + 1]]
+            resolved = []
+            for word in words:
+                assert (word >> 13) & 3 == lines[n]
+                tile = tiles[word & TILE_INDEX_MASK]
+                if word & TILE_ATTR_HFLIP:
+                    tile = hflip_tile(tile)
+                if word & TILE_ATTR_VFLIP:
+                    tile = vflip_tile(tile)
+                resolved.append(tile)
+            assert b"".join(resolved) == expected[frame]
+
+
+class _MirroredTiles(BankExporter):
+    """Bank exporter whose frames are one tile and its flipped copies.
+
+    Rendered characters are never exact mirror images tile for tile, so
+    flips are exercised with made-up tile data.
+    """
+
+    def _render(self, jobs):
+        tile = bytes(range(32))
+        frame = (tile + hflip_tile(tile) + vflip_tile(tile)
+                 + hflip_tile(vflip_tile(tile)))
+        return [[frame] for _ in jobs]
+
+
+def test_map_words_combine_flips_and_palette_line():
+    bank = _MirroredTiles(workers=1).export_to_memory(CHARACTERS, "bank")
+    maps = c_array(bank["c_file"], "bank_maps")
+    lines = c_array(bank["c_file"], "bank_palette_line")
+
+    flips = [0, TILE_ATTR_HFLIP, TILE_ATTR_VFLIP,
+             TILE_ATTR_HFLIP | TILE_ATTR_VFLIP]
+    assert maps == [attr | line << 13 for line in lines for attr in flips]
+    assert bank["stats"]["unique_tiles"] == 1
+
+
+def test_identical_characters_share_tiles():
+    character = dict(CHARACTERS[0][1])
+    one = BankExporter(workers=1).export_to_memory([("a", character)], "one")
+    three = BankExporter(workers=1).export_to_memory(
+        [("a", character), ("b", character), ("c", character)], "three")
+
+    assert three["stats"]["unique_tiles"] == one["stats"]["unique_tiles"]
+    assert three["stats"]["tiles"] == 3 * one["stats"]["tiles"]
+    assert three["stats"]["palette_lines"] == 1
+
+
+def test_map_offsets_pass_0xffff():
+    # 8 frames of 64 tiles per character; 130 characters need 66560
+    # map entries, past what a u16 offset can reach
+    character = {"size": 64, "animation_frames": 8}
+    characters = [(f"c{n}", character) for n in range(130)]
+
+    bank = BankExporter(workers=1).export_to_memory(characters, "big")
+
+    offsets = c_array(bank["c_file"], "big_map_offset")
+    assert offsets == [64 * frame for frame in range(130 * 8)]
+    assert offsets[-1] > 0xFFFF
+    assert "const u32 big_map_offset[1040]" in bank["c_file"]
+
+
+def test_invalid_spec_is_rejected():
+    characters = CHARACTERS[:1] + [("bad", {"head_type": "hexagon"})]
+
+    with pytest.raises(ValueError, match="'bad'"):
+        BankExporter(workers=1).export_to_memory(characters, "bank")
+
+
+def test_names_colliding_as_identifiers_are_rejected():
+    characters = [("Hero", {}), ("hero", {})]
+
+    with pytest.raises(ValueError, match="duplicate name HERO"):
+        BankExporter(workers=1).export_to_memory(characters, "bank")
+
+
+def test_empty_bank_is_rejected():
+    with pytest.raises(ValueError, match="at least one character"):
+        BankExporter(workers=1).export_to_memory([], "empty")
@@ -0,0 +1,94 @@
+"""Tests for batch export and its command line."""
+
+import json
+import pytest
+import batch_export
+from app.core.batch import export_batch, load_specs, output_names
+
+
+def _write_jsonl(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_bad_lines_fail_alone(tmp_path):
+    source = _write_jsonl(tmp_path / "npcs.jsonl", [
+        json.dumps({"name": "slime", "size": 16}),
+        "{not json",
+        "[1, 2, 3]",
+        "",
+        json.dumps({"name": "bat", "size": 16, "head_type": "hexagon"}),
+        json.dumps({"name": "ghost", "size": 16}),
+    ])
+
+    specs, load_failures = load_specs(source)
+
+    assert [name for name, _ in specs] == ["slime", "bat", "ghost"]
+    assert [name for name, _ in load_failures] == ["character_2",
+                                                   "character_3"]
+
+    output_dir = tmp_path / "out"
+    summary = export_batch(specs, str(output_dir), workers=1,
+                           load_failures=load_failures)
+
+    assert summary["total"] == 5
+    assert (summary["exported"], summary["failed"]) == (2, 3)
+    assert [name for name, _ in summary["failures"]] == [
+        "character_2", "character_3", "bat"]
+    assert (output_dir / "slime.c").exists()
+    assert (output_dir / "ghost.h").exists()
+    assert not (output_dir / "bat.c").exists()
+
+
+def test_output_names_are_sanitised():
+    named, failures = output_names([("../../etc/x y", {}), ("ok", {})])
+
+    assert [output_name for _, output_name, _ in named] == ["______etc_x_y",
+                                                           "ok"]
+    assert failures == []
+
+
+def test_output_names_collide_case_insensitively():
+    named, failures = output_names([("Hero", {}), ("hero", {}),
+                                    ("HERO!", {}), ("villain", {})])
+
+    assert [name for name, _, _ in named] == ["Hero", "HERO!", "villain"]
+    assert [name for name, _ in failures] == ["hero"]
+    assert "already used by 'Hero'" in failures[0][1]
+
+
+@pytest.mark.parametrize("option", [
+    ["--layout", "linear"],
+    ["--layout", "tiles"],
+    ["--dedupe-tiles"],
+    ["--compression", "aplib"],
+    ["--format", "c"],
+])
+def test_bank_rejects_options_it_ignores(option, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        batch_export.parse_args(["npcs.jsonl", "--bank", "level1"] + option)
+
+    assert exit_info.value.code == 2
+    assert "cannot be used with --bank" in capsys.readouterr().err
+
+
+def test_cli_counts_load_failures(tmp_path, capsys):
+    source = _write_jsonl(tmp_path / "npcs.jsonl", [
+        json.dumps({"name": "slime", "size": 16}),
+        "{not json",
+    ])
+
+    code = batch_export.main([source, "-o", str(tmp_path / "out"),
+                              "-j", "1", "-q"])
+
+    captured = capsys.readouterr()
+    assert code == 1
+    assert "Exported 1/2 characters" in captured.out
+    assert "failed: character_2" in captured.err
+
+
+def test_cli_reports_missing_source(tmp_path, capsys):
+    code = batch_export.main([str(tmp_path / "missing.jsonl")])
+
+    assert code == 1
+    assert "Cannot read" in capsys.readouterr().err
@@ -0,0 +1,71 @@
+"""Tests for the LRU frame cache and the generator's use of it."""
+
+from app.core.cache import FrameCache
+from app.core.generator import CharacterGenerator
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FrameCache(max_entries=3)
+    for key in "abc":
+        cache.put(key, key.upper())
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == "A"
+    cache.put("d", "D")
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+    cache.put("e", "E")
+    assert cache.get("a") is None
+
+
+def test_counters():
+    cache = FrameCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    cache.put("c", 3)
+    cache.put("d", 4)
+
+    assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 2,
+                             "misses": 1, "evictions": 2}
+
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "max_entries": 2, "hits": 0,
+                             "misses": 0, "evictions": 0}
+
+
+def test_disabled_cache_stores_nothing():
+    cache = FrameCache(max_entries=0)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_generator_hits_cache_for_repeated_frames():
+    generator = CharacterGenerator()
+    character = {"size": 32, "animation_frames": 4}
+
+    for frame in (0, 1, 0, 1, 4):
+        generator.generate_character(character, frame)
+
+    # Frame 4 wraps around to frame 0
+    stats = generator.cache_stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (2, 3, 2)
+
+
+def test_generator_returns_copies():
+    generator = CharacterGenerator()
+    character = {"size": 32}
+    original = generator.generate_character(character).tobytes()
+
+    first = generator.generate_character(character)
+    first.paste((255, 0, 0, 255), (0, 0, 32, 32))
+    second = generator.generate_character(character)
+
+    assert second is not first
+    assert second.tobytes() == original
+    assert generator.cache_stats()["hits"] == 2
@@ -0,0 +1,75 @@
+"""Golden tests for bulk C source formatting."""
+
+import io
+import random
+import pytest
+from app.core.csource import CSourceWriter
+
+
+def reference_array(declaration, values, per_row, digits):
+    """The original per-element writer loop CSourceWriter replaced."""
+    f = io.StringIO()
+    f.write(f"{declaration} = {{\n")
+    for i, value in enumerate(values):
+        if i % per_row == 0:
+            f.write("    ")
+        f.write(f"0x{value:0{digits}X}")
+        if i < len(values) - 1:
+            f.write(", ")
+        if i % per_row == per_row - 1:
+            f.write("\n")
+    f.write("\n};\n\n")
+    return f.getvalue()
+
+
+def reference_animation(name, frame_count):
+    """The original SpriteDefinition pointer array loop."""
+    f = io.StringIO()
+    f.write(f"const SpriteDefinition* {name}_animation[{frame_count}] = {{\n")
+    for frame_idx in range(frame_count):
+        f.write(f"    &{name}_frame{frame_idx}")
+        if frame_idx < frame_count - 1:
+            f.write(",")
+        f.write("\n")
+    f.write("};\n\n")
+    return f.getvalue()
+
+
+# Empty, one partial row, exact multiples of the row width and a partial
+# last row after full ones
+LENGTHS = [0, 1, 5, 8, 16, 32, 33, 47]
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_u8_array_matches_element_loop(length):
+    rng = random.Random(length)
+    data = bytes(rng.randrange(256) for _ in range(length))
+    declaration = f"const u8 data[{length}]"
+    stream = io.StringIO()
+
+    CSourceWriter(stream).u8_array(declaration, data, 16)
+
+    assert stream.getvalue() == reference_array(declaration, data, 16, 2)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_u16_array_matches_element_loop(length):
+    rng = random.Random(length)
+    values = [rng.randrange(0x10000) for _ in range(length)]
+    declaration = f"const u16 data[{length}]"
+    stream = io.StringIO()
+
+    CSourceWriter(stream).u16_array(declaration, values, 8)
+
+    assert stream.getvalue() == reference_array(declaration, values, 8, 4)
+
+
+@pytest.mark.parametrize("frame_count", [1, 2, 8])
+def test_pointer_array_matches_element_loop(frame_count):
+    stream = io.StringIO()
+
+    CSourceWriter(stream).pointer_array(
+        f"const SpriteDefinition* hero_animation[{frame_count}]",
+        [f"&hero_frame{i}" for i in range(frame_count)])
+
+    assert stream.getvalue() == reference_animation("hero", frame_count)
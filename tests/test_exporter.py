@@ -0,0 +1,193 @@
+"""Tests for the SGDK exporter's sprite data packing."""
+
+import random
+import pytest
+from PIL import Image
+from app.core.exporter import (LAYOUT_TILES, SGDKExporter, pack_4bpp,
+                               pack_sprite_frames)
+
+
+def referencepack_4bpp(pixels):
+    """The original per-pixel pair loop pack_4bpp replaced."""
+    frame_data = []
+    for i in range(0, len(pixels), 2):
+        pixel1 = pixels[i] & 0x0F
+        pixel2 = pixels[i + 1] & 0x0F if i + 1 < len(pixels) else 0
+        frame_data.append((pixel1 << 4) | pixel2)
+    return bytes(frame_data)
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 7, 64, 255, 1024, 4097])
+def test_pack_4bpp_matches_pair_loop(length):
+    rng = random.Random(length)
+    # Full byte values, so indices above 15 are masked the same way
+    pixels = bytes(rng.randrange(256) for _ in range(length))
+
+    assert pack_4bpp(pixels) == referencepack_4bpp(pixels)
+
+
+def test_pack_4bpp_keeps_leading_zero_bytes():
+    pixels = bytes([0, 0, 0, 0, 0, 1])
+
+    assert pack_4bpp(pixels) == b"\x00\x00\x01"
+
+
+def reference_tile_order(frame):
+    """Per-pixel tile order: 32x32 blocks, then x//8 column strips, then
+    tiles top to bottom, padding with index 0."""
+    width, height = frame.size
+    tiles_w = (width + 7) // 8
+    tiles_h = (height + 7) // 8
+    pixels = []
+    for block_y in range(0, tiles_h, 4):
+        for block_x in range(0, tiles_w, 4):
+            for tile_x in range(block_x, min(block_x + 4, tiles_w)):
+                for tile_y in range(block_y, min(block_y + 4, tiles_h)):
+                    for y in range(tile_y * 8, tile_y * 8 + 8):
+                        for x in range(tile_x * 8, tile_x * 8 + 8):
+                            inside = x < width and y < height
+                            pixels.append(frame.getpixel((x, y)) if inside
+                                          else 0)
+    return bytes(pixels)
+
+
+@pytest.mark.parametrize("size", [8, 13, 16, 23, 32, 40, 41, 64])
+def test_tiles_layout_matches_per_pixel_order(size):
+    rng = random.Random(size)
+    frame = Image.frombytes("P", (size, size),
+                            bytes(rng.randrange(1, 16)
+                                  for _ in range(size * size)))
+
+    packed, = pack_sprite_frames([frame], LAYOUT_TILES)
+
+    assert packed == referencepack_4bpp(reference_tile_order(frame))
+    assert len(packed) == ((size + 7) // 8) ** 2 * 32
+
+
+def test_header_describes_sprite_blocks():
+    exporter = SGDKExporter()
+    small = exporter.export_to_memory({"size": 32}, "small",
+                                      layout=LAYOUT_TILES)
+    large = exporter.export_to_memory({"size": 48}, "large",
+                                      layout=LAYOUT_TILES)
+
+    assert "_SPRITES_W" not in small["h_file"]
+    assert "#define LARGE_SPRITES_W 2\n" in large["h_file"]
+    assert "#define LARGE_SPRITES_H 2\n" in large["h_file"]
+
+
+@pytest.mark.parametrize("output_format", ["c", "binary"])
+@pytest.mark.parametrize("compression", [None, "aplib"])
+def test_variants_without_variants_match_plain_export(output_format,
+                                                      compression):
+    exporter = SGDKExporter()
+    # Distinct part colours, so each part has its own index either way
+    character = {"size": 24, "animation_frames": 3, "head_color": "#FFDDAA",
+                 "body_color": "#CC2222", "arm_color": "#EEBB88",
+                 "leg_color": "#2222CC"}
+
+    plain = exporter.export_to_memory(character, "hero", LAYOUT_TILES,
+                                      compression=compression,
+                                      output_format=output_format)
+    variants = exporter.export_variants(character, [], "hero", LAYOUT_TILES,
+                                        compression, output_format)
+
+    for key in ("c_file", "h_file", "res_file", "bin_files", "png_file"):
+        assert variants[key] == plain[key]
+
+
+def _indexed_and_quantized(character, frame):
+    """Render a frame both ways with the exporter's palette."""
+    exporter = SGDKExporter()
+    palette = exporter._create_megadrive_palette(character)
+    indexed = exporter.generator.generate_indexed(character, palette, frame)
+    quantized = exporter._convert_to_indexed(
+        exporter.generator.generate_character(character, frame), palette)
+    return indexed.tobytes(), quantized.tobytes()
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_indexed_rendering_matches_quantize_for_distinct_colours(seed):
+    rng = random.Random(seed)
+    # Colours well away from each other and from black, white and grey
+    colors = rng.sample(["#FF0000", "#00CC00", "#0000FF", "#FFDDAA",
+                         "#CC22CC", "#22CCCC", "#CCCC22", "#663300"], 4)
+    character = {
+        "head_type": rng.choice(["round", "square", "oval", "triangle"]),
+        "body_type": rng.choice(["normal", "muscular", "slim", "round"]),
+        "arm_type": rng.choice(["normal", "muscular", "thin", "long"]),
+        "leg_type": rng.choice(["normal", "muscular", "thin", "long"]),
+        "head_color": colors[0], "body_color": colors[1],
+        "arm_color": colors[2], "leg_color": colors[3],
+        "size": rng.choice([16, 24, 32, 48, 64]), "animation_frames": 4,
+    }
+
+    for frame in range(4):
+        indexed, quantized = _indexed_and_quantized(character, frame)
+        assert indexed == quantized
+
+
+@pytest.mark.parametrize("near, entry", [
+    ({"body_color": "#010101"}, 0),
+    ({"head_color": "#FF0000", "body_color": "#FF0001"}, 1),
+])
+def test_indexed_rendering_keeps_near_duplicates_exact(near, entry):
+    indexed, quantized = _indexed_and_quantized({"size": 32, **near}, 0)
+
+    # quantize moves some body pixels (entry 2) onto the nearly equal
+    # earlier entry; direct rendering keeps every body pixel on entry 2
+    diffs = {(a, b) for a, b in zip(indexed, quantized) if a != b}
+    assert diffs == {(2, entry)}
+
+
+@pytest.mark.parametrize("layout", ["linear", LAYOUT_TILES])
+def test_binary_output_holds_packed_frames_and_palette(layout):
+    exporter = SGDKExporter()
+    character = {"size": 24, "animation_frames": 2, "body_color": "#808080"}
+    palette = exporter._create_megadrive_palette(character)
+    frames = [exporter.generator.generate_indexed(character, palette, frame)
+              for frame in range(2)]
+
+    files = exporter.export_to_memory(character, "hero", layout,
+                                      output_format="binary")
+
+    bin_files = files["bin_files"]
+    assert sorted(bin_files) == ["hero_frame0_data.bin",
+                                 "hero_frame1_data.bin", "hero_palette.bin"]
+    for frame, data in enumerate(pack_sprite_frames(frames, layout)):
+        assert bin_files[f"hero_frame{frame}_data.bin"] == data
+    # Big-endian CRAM words, the legacy encoding by default
+    palette_words = bin_files["hero_palette.bin"]
+    assert palette_words == b"".join(word.to_bytes(2, "big")
+                                     for word in palette.md_words)
+    assert palette_words[4:6] == b"\x11\x10"
+    for file_name in bin_files:
+        identifier = file_name[:-len(".bin")]
+        assert (f'BIN {identifier} "{file_name}" 2 2 0 NONE FALSE\n'
+                in files["res_file"])
+    assert files["c_file"] == files["h_file"] == ""
+
+
+@pytest.mark.parametrize("output_format", ["c", "binary"])
+@pytest.mark.parametrize("dedupe_tiles", [False, True])
+def test_export_character_writes_what_export_to_memory_builds(
+        tmp_path, output_format, dedupe_tiles):
+    character = {"size": 24, "animation_frames": 2}
+    exporter = SGDKExporter()
+
+    exporter.export_character(character, str(tmp_path / "hero.c"),
+                              LAYOUT_TILES, dedupe_tiles,
+                              output_format=output_format)
+    files = exporter.export_to_memory(character, "hero", LAYOUT_TILES,
+                                      dedupe_tiles,
+                                      output_format=output_format)
+
+    expected = {"hero.png": files["png_file"]}
+    if output_format == "binary":
+        expected["hero.res"] = files["res_file"].encode()
+        expected.update(files["bin_files"])
+    else:
+        expected["hero.c"] = files["c_file"].encode()
+        expected["hero.h"] = files["h_file"].encode()
+    written = {path.name: path.read_bytes() for path in tmp_path.iterdir()}
+    assert written == expected
@@ -0,0 +1,66 @@
+"""Tests for stage timing and Prometheus output."""
+
+import re
+from app.core.metrics import STAGE_METRIC, Histogram, Metrics
+
+
+def test_timer_is_a_no_op_while_disabled():
+    metrics = Metrics(enabled=False)
+
+    with metrics.timer("render"):
+        pass
+    metrics.observe("render", 0.5)
+    metrics.increment("requests_total")
+
+    assert metrics.render_prometheus() == "\n"
+    # Disabled timers are one shared object, not a new one per call
+    assert metrics.timer("a") is metrics.timer("b")
+
+
+def test_timer_records_while_enabled():
+    metrics = Metrics(enabled=True)
+
+    with metrics.timer("render"):
+        pass
+
+    assert f'{STAGE_METRIC}_count{{stage="render"}} 1' in (
+        metrics.render_prometheus())
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    cumulative, total, count = histogram.snapshot()
+
+    # Bounds are inclusive, and the last slot is +Inf
+    assert cumulative == [2, 4, 5]
+    assert count == 5
+    assert abs(total - 4.35) < 1e-9
+
+
+def test_inf_bucket_equals_count():
+    metrics = Metrics(enabled=True)
+    for value in (0.00001, 0.003, 0.2, 7.0):
+        metrics.observe("export", value)
+
+    text = metrics.render_prometheus()
+    buckets = [int(value) for value in re.findall(
+        rf'{STAGE_METRIC}_bucket{{stage="export",le="[^"]+"}} (\d+)', text)]
+    inf = re.search(rf'le="\+Inf"}} (\d+)', text).group(1)
+    count = re.search(rf'{STAGE_METRIC}_count{{stage="export"}} (\d+)',
+                      text).group(1)
+
+    assert buckets == sorted(buckets)
+    assert int(inf) == int(count) == 4 == buckets[-1]
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics(enabled=True)
+    metrics.increment("requests_total", endpoint='/a"b\\c\nd')
+
+    text = metrics.render_prometheus()
+
+    assert 'requests_total{endpoint="/a\\"b\\\\c\\nd"} 1' in text
+    assert text.count("\n") == 2
@@ -0,0 +1,87 @@
+"""Tests for interned colour palettes."""
+
+import pytest
+from PIL import Image, ImageColor
+from app.core.palette import Palette, get_palette
+from app.core.palette_alloc import md_word
+
+COLORS = ["#000000", "#FF0000", "#00FF00", "#FF0000", "#808080"]
+
+
+def test_equal_colours_share_one_palette():
+    palette = get_palette(COLORS)
+
+    assert get_palette(tuple(COLORS)) is palette
+    assert get_palette(iter(COLORS)) is palette
+    assert get_palette(palette) is palette
+    assert get_palette(COLORS[:-1]) is not palette
+
+
+def test_behaves_like_a_colour_sequence():
+    palette = get_palette(["#000000", "#ff8000", "white"])
+
+    assert list(palette) == ["#000000", "#FF8000", "#FFFFFF"]
+    assert len(palette) == 3
+    assert palette[1] == "#FF8000"
+    assert palette == Palette(["#000000", "#FF8000", "#FFFFFF"])
+    assert hash(palette) == hash(Palette(list(palette)))
+
+
+@pytest.mark.parametrize("color, index", [
+    ("#000000", 0),
+    ("#FF0000", 1),  # repeated at 3, so the lowest index wins
+    ("#00FF00", 2),
+    ("#808080", 4),
+    ("#F01010", 1),  # nearest entry
+    ("#101010", 0),
+    ("#90A090", 4),
+])
+def test_index_of(color, index):
+    assert get_palette(COLORS).index_of(color) == index
+
+
+def test_index_of_matches_quantize():
+    palette = get_palette(COLORS)
+    colors = ["#000000", "#FF0000", "#00FF00", "#808080", "#F01010"]
+    source = Image.new("RGB", (len(colors), 1))
+    for x, color in enumerate(colors):
+        source.putpixel((x, 0), ImageColor.getrgb(color))
+
+    quantized = source.quantize(palette=palette.image, dither=0)
+
+    assert list(quantized.tobytes()) == [palette.index_of(color)
+                                         for color in colors]
+
+
+def test_flat_is_padded_to_256_entries():
+    palette = get_palette(["#102030", "#405060"])
+
+    assert len(palette.flat) == 768
+    assert palette.flat[:6] == (0x10, 0x20, 0x30, 0x40, 0x50, 0x60)
+    assert set(palette.flat[6:]) == {0}
+    assert palette.image.getpalette()[:6] == list(palette.flat[:6])
+
+
+@pytest.mark.parametrize("color, cram, legacy", [
+    ("#000000", 0x000, 0x000),
+    ("#FFFFFF", 0xEEE, 0x1FFE),
+    # The legacy shift puts bit 7 above each 3-bit field, so 0x80 reads
+    # as level 0 in CRAM instead of level 4
+    ("#808080", 0x888, 0x1110),
+    ("#E02000", 0x02E, 0x05C),
+])
+def test_cram_words_differ_from_legacy_words(color, cram, legacy):
+    palette = get_palette([color])
+
+    assert palette.cram_words == (cram,)
+    assert palette.md_words == (legacy,)
+    assert palette.cram_words[0] == md_word(color)
+
+
+def test_palette_is_immutable():
+    palette = get_palette(COLORS)
+
+    with pytest.raises(AttributeError, match="immutable"):
+        palette.colors = ("#FFFFFF",)
+    with pytest.raises(AttributeError):
+        palette.extra = 1
@@ -0,0 +1,40 @@
+"""Tests for shared palette allocation and bank palettes."""
+
+import pytest
+from app.core.exporter import SGDKExporter
+from app.core.palette import get_palette
+from app.core.palette_alloc import character_colors, md_word, snap_color
+
+
+@pytest.mark.parametrize("color, word", [
+    ("#000000", 0x000),
+    ("#929292", 0x888),
+    ("#242424", 0x222),
+    ("#FFFFFF", 0xEEE),
+    ("#FFDDAA", 0xACE),
+])
+def test_md_word_uses_snapped_levels(color, word):
+    assert md_word(snap_color(color)) == word
+
+
+def test_missing_colours_take_their_defaults():
+    assert character_colors({}) == [snap_color("#FFDDAA"),
+                                    snap_color("#0066CC")]
+
+
+@pytest.mark.parametrize("color", ["#000000", "#929292", "#808080",
+                                   "#FFFFFF", "#FFDDAA", "#0066CC"])
+def test_cram_words_match_md_word(color):
+    assert get_palette([color]).cram_words == (md_word(color),)
+
+
+def test_exact_cram_exporter_matches_bank_words():
+    character = {"head_color": "#808080", "body_color": "#FFDDAA"}
+    palette = SGDKExporter()._create_megadrive_palette(character)
+
+    legacy = SGDKExporter()._generate_palette_data(palette)
+    exact = SGDKExporter(exact_cram=True)._generate_palette_data(palette)
+
+    assert exact[1:3] == [md_word("#808080"), md_word("#FFDDAA")]
+    # The legacy words keep their overflowing low bits
+    assert legacy[1] == 0x1110
@@ -0,0 +1,50 @@
+"""Tests for the part-geometry registry."""
+
+import pytest
+from app.core.generator import CharacterGenerator
+from app.core.parts import PART_TYPES, filled, geometry_version, register_part
+
+CHARACTER = {"head_type": "square", "size": 32, "animation_frames": 2}
+
+
+@pytest.fixture
+def square_head():
+    """Restore the square head's geometry after a test overrides it."""
+    original = PART_TYPES["head"]["square"]
+    yield
+    register_part("head", "square")(original)
+
+
+def _tiny_head(size, walk_offset, bob_offset):
+    return [filled("rectangle", (0, 0, 3, 3))]
+
+
+def test_override_invalidates_generator_caches(square_head):
+    generator = CharacterGenerator()
+    before = [generator.generate_character(CHARACTER, frame).tobytes()
+              for frame in range(2)]
+    roles = generator.generate_roles(CHARACTER).tobytes()
+    version = geometry_version()
+
+    register_part("head", "square")(_tiny_head)
+
+    assert geometry_version() != version
+    after = [generator.generate_character(CHARACTER, frame).tobytes()
+             for frame in range(2)]
+    assert after[0] != before[0] and after[1] != before[1]
+    assert generator.generate_roles(CHARACTER).tobytes() != roles
+    fresh = CharacterGenerator(cache_size=0, role_cache_size=0)
+    assert after[0] == fresh.generate_character(CHARACTER).tobytes()
+
+
+def test_override_invalidates_rasterizer_layers(square_head):
+    pytest.importorskip("numpy")
+    from app.core.raster import BatchRasterizer
+    rasterizer = BatchRasterizer()
+    rasterizer.generate_many([CHARACTER])
+
+    register_part("head", "square")(_tiny_head)
+
+    fresh = CharacterGenerator(cache_size=0, role_cache_size=0)
+    assert (rasterizer.generate_many([CHARACTER])[0, 0].tobytes()
+            == fresh.generate_roles(CHARACTER).tobytes())
@@ -0,0 +1,32 @@
+"""Tests for the preview palette and rendering."""
+
+import pytest
+from app.core.generator import CharacterGenerator
+from app.core.preview import preview_palette, render_preview
+
+
+@pytest.mark.parametrize("color", ["#f0f", "magenta", "#ff00ff"])
+def test_key_colour_differs_from_part_colours(color):
+    character = {"body_color": color, "size": 32}
+    palette = preview_palette(character)
+
+    assert palette[0] != "#FF00FF"
+    assert palette.colors.count("#FF00FF") == 1
+
+
+@pytest.mark.parametrize("color", ["#f0f", "magenta", "#0f0", "lime"])
+def test_preview_matches_rgba_render(color):
+    generator = CharacterGenerator()
+    character = {"body_color": color, "leg_color": color, "size": 32,
+                 "animation_frames": 4}
+
+    for frame in range(4):
+        preview = render_preview(generator, character, frame)
+        expected = generator.generate_character(character, frame)
+        rgb = preview_palette(character).rgb
+        # Index 0 is the transparent key, everything else is opaque
+        rendered = bytes(component for index in preview.tobytes()
+                         for component in (rgb[index] + (255,) if index
+                                           else (0, 0, 0, 0)))
+
+        assert rendered == expected.tobytes()
@@ -0,0 +1,49 @@
+"""Tests for the bounded render pool's back-pressure."""
+
+import threading
+import pytest
+from app.core.render_pool import RenderPool, RenderPoolBusy
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=2, max_pending=3)
+    yield pool
+    pool.shutdown()
+
+
+def test_busy_at_max_pending(pool):
+    release = threading.Event()
+    futures = [pool.submit(release.wait) for _ in range(3)]
+
+    # Two jobs run and one queues; a fourth is refused, not queued
+    with pytest.raises(RenderPoolBusy):
+        pool.submit(release.wait)
+    assert pool.stats()["pending"] == 3
+    assert pool.stats()["rejected"] == 1
+
+    release.set()
+    for future in futures:
+        future.result()
+    assert pool.stats()["pending"] == 0
+    assert pool.run(sum, [1, 2]) == 3
+
+
+def test_failed_job_releases_its_slot(pool):
+    def fail():
+        raise KeyError("broken")
+
+    for _ in range(5):
+        with pytest.raises(KeyError):
+            pool.run(fail)
+
+    assert pool.stats()["pending"] == 0
+    assert pool.stats()["rejected"] == 0
+
+
+def test_failed_submit_releases_its_slot(pool):
+    pool.shutdown()
+
+    with pytest.raises(RuntimeError):
+        pool.submit(sum, [])
+    assert pool.stats()["pending"] == 0
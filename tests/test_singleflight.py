@@ -0,0 +1,101 @@
+"""Tests for coalescing identical concurrent calls."""
+
+import threading
+import time
+import pytest
+from app.core.singleflight import SingleFlight
+
+CALLERS = 8
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _call_concurrently(flight, key, fn):
+    """Call flight.do from CALLERS threads while fn blocks on an event.
+
+    Returns:
+        tuple: The event to release fn with, and a function joining the
+        threads that returns each caller's result or exception
+    """
+    release = threading.Event()
+    outcomes = [None] * CALLERS
+
+    def call(n):
+        try:
+            outcomes[n] = flight.do(key, fn, release)
+        except Exception as e:
+            outcomes[n] = e
+
+    threads = [threading.Thread(target=call, args=(n,))
+               for n in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    # Every caller but the one running fn is waiting on its result
+    _wait_for(lambda: flight.stats()["coalesced"] == CALLERS - 1)
+
+    def join():
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    return release, join
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    runs = []
+
+    def render(release):
+        release.wait()
+        runs.append(1)
+        return object()
+
+    release, join = _call_concurrently(flight, "frame", render)
+    release.set()
+    results = join()
+
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 1, "coalesced": CALLERS - 1,
+                              "in_flight": 0}
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    def render(release):
+        release.wait()
+        raise ValueError("bad spec")
+
+    release, join = _call_concurrently(flight, "frame", render)
+    release.set()
+    results = join()
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_key_is_cleared_after_the_call(fail):
+    flight = SingleFlight()
+    runs = []
+
+    def render():
+        runs.append(1)
+        if fail:
+            raise ValueError("bad spec")
+        return len(runs)
+
+    for _ in range(2):
+        try:
+            flight.do("frame", render)
+        except ValueError:
+            pass
+
+    assert len(runs) == 2
+    assert flight.stats() == {"calls": 2, "coalesced": 0, "in_flight": 0}
@@ -0,0 +1,94 @@
+"""Tests for validated character specifications."""
+
+import pickle
+import pytest
+from app.core.generator import CHARACTER_DEFAULTS, character_digest
+from app.core.spec import CharacterSpec
+
+CHARACTER = {
+    "head_type": "square",
+    "body_type": "slim",
+    "arm_type": "long",
+    "leg_type": "thin",
+    "head_color": "#ffddaa",
+    "body_color": "#CC2222",
+    "arm_color": "#EEBB88",
+    "leg_color": "#2222cc",
+    "size": 48,
+    "animation_frames": 4,
+}
+
+
+@pytest.mark.parametrize("field, value", [
+    ("head_type", "hexagon"),
+    ("body_type", None),
+    ("leg_type", "round"),
+])
+def test_unknown_part_type_is_rejected(field, value):
+    with pytest.raises(ValueError, match=field):
+        CharacterSpec(**{field: value})
+
+
+@pytest.mark.parametrize("value", ["#GGGGGG", "not a colour", "", 0xFFFFFF])
+def test_bad_colour_is_rejected(value):
+    with pytest.raises(ValueError, match="body_color"):
+        CharacterSpec(body_color=value)
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError, match="tail_type"):
+        CharacterSpec(tail_type="long")
+
+
+def test_from_dict_ignores_unrelated_keys():
+    spec = CharacterSpec.from_dict({**CHARACTER, "name": "hero", "frame": 2})
+
+    assert spec.to_dict() == CharacterSpec(**CHARACTER).to_dict()
+
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("size", 4, 16),
+    ("size", 200, 64),
+    ("size", "40", 40),
+    ("animation_frames", 0, 1),
+    ("animation_frames", 12, 8),
+])
+def test_size_and_frames_are_clamped(field, value, expected):
+    assert CharacterSpec(**{field: value})[field] == expected
+
+
+@pytest.mark.parametrize("field, value", [
+    ("size", True),
+    ("size", "large"),
+    ("animation_frames", None),
+])
+def test_non_integer_size_and_frames_are_rejected(field, value):
+    with pytest.raises(ValueError, match=field):
+        CharacterSpec(**{field: value})
+
+
+def test_pickle_round_trip():
+    spec = CharacterSpec(**CHARACTER)
+
+    restored = pickle.loads(pickle.dumps(spec))
+
+    assert restored == spec
+    assert restored.digest == spec.digest
+    assert restored.to_dict() == spec.to_dict()
+
+
+@pytest.mark.parametrize("data", [CHARACTER, {}, {"body_color": "#cc2222"}])
+def test_digest_matches_plain_dict(data):
+    spec = CharacterSpec.from_dict(data)
+
+    # The frame cache keys dicts and specs alike by character_digest
+    assert spec.digest == character_digest(data)
+    assert character_digest(spec) == character_digest(data)
+
+
+def test_spec_reads_like_the_dict():
+    spec = CharacterSpec()
+
+    assert dict(spec) == CHARACTER_DEFAULTS
+    with pytest.raises(AttributeError):
+        spec.size = 32
@@ -0,0 +1,87 @@
+"""Tests for flip-aware tile deduplication."""
+
+import random
+import pytest
+from app.core.tileset import (TILE_ATTR_HFLIP, TILE_ATTR_VFLIP, TileSet,
+                              hflip_tile, vflip_tile)
+
+
+def pack_tile(rows):
+    """Pack an 8x8 grid of palette indices into a 32-byte 4bpp tile."""
+    return bytes((row[x] << 4) | row[x + 1] for row in rows
+                 for x in range(0, 8, 2))
+
+
+def asymmetric_rows(seed=0):
+    """An 8x8 grid that is not symmetric under any flip."""
+    rng = random.Random(seed)
+    rows = [[rng.randrange(16) for _ in range(8)] for _ in range(8)]
+    rows[0][0], rows[0][7], rows[7][0], rows[7][7] = 1, 2, 3, 4
+    return rows
+
+
+ROWS = asymmetric_rows()
+TILE = pack_tile(ROWS)
+HFLIPPED = pack_tile([row[::-1] for row in ROWS])
+VFLIPPED = pack_tile(ROWS[::-1])
+HVFLIPPED = pack_tile([row[::-1] for row in ROWS[::-1]])
+
+
+def test_flip_helpers_match_pixel_flips():
+    assert hflip_tile(TILE) == HFLIPPED
+    assert vflip_tile(TILE) == VFLIPPED
+    assert hflip_tile(vflip_tile(TILE)) == HVFLIPPED
+
+
+def test_flipped_copies_share_one_tile():
+    tileset = TileSet()
+    attrs = [tileset.add(tile)
+             for tile in (TILE, HFLIPPED, VFLIPPED, HVFLIPPED, TILE)]
+
+    assert attrs == [0, TILE_ATTR_HFLIP, TILE_ATTR_VFLIP,
+                     TILE_ATTR_HFLIP | TILE_ATTR_VFLIP, 0]
+    assert tileset.data() == TILE
+    assert tileset.stats() == {"tiles": 5, "unique_tiles": 1}
+
+
+def test_without_flips_every_orientation_is_stored():
+    tileset = TileSet(use_flips=False)
+    attrs = [tileset.add(tile)
+             for tile in (TILE, HFLIPPED, VFLIPPED, HVFLIPPED)]
+
+    assert attrs == [0, 1, 2, 3]
+
+
+def test_resolve_round_trips_frame_maps():
+    rng = random.Random(1)
+    tiles = [pack_tile(asymmetric_rows(seed)) for seed in range(6)]
+    # Every tile in every orientation, plus repeats, in random order
+    frame = [flip(tile) for tile in tiles
+             for flip in (bytes, hflip_tile, vflip_tile,
+                          lambda t: hflip_tile(vflip_tile(t)))] * 2
+    rng.shuffle(frame)
+    tileset = TileSet()
+
+    frame_map = tileset.add_frame(b"".join(frame))
+
+    assert len(tileset) == len(tiles)
+    assert [tileset.resolve(attr) for attr in frame_map] == frame
+
+
+def test_symmetric_tile_keeps_unflipped_entry():
+    tileset = TileSet()
+    solid = bytes([0x55] * 32)
+
+    assert tileset.add(solid) == 0
+    assert tileset.add(hflip_tile(solid)) == 0
+
+
+def test_more_than_2048_tiles_is_an_error():
+    tileset = TileSet(use_flips=False)
+    for index in range(2048):
+        tileset.add(index.to_bytes(2, "big") + bytes(30))
+
+    with pytest.raises(ValueError):
+        tileset.add(b"\xff" * 32)
+    # Tiles already in the set are still found
+    assert tileset.add(bytes(32)) == 0
@@ -0,0 +1,149 @@
+"""Tests for the web app's endpoints."""
+
+import base64
+import io
+import pytest
+from PIL import Image
+
+pytest.importorskip("flask")
+import web_app  # noqa: E402
+
+CHARACTER = {"size": 24, "animation_frames": 3, "body_color": "#CC2222"}
+
+
+def _data_url_image(url):
+    """Open the PNG in a base64 data URL."""
+    prefix = "data:image/png;base64,"
+    assert url.startswith(prefix)
+    return Image.open(io.BytesIO(base64.b64decode(url[len(prefix):])))
+
+
+@pytest.fixture
+def client():
+    return web_app.app.test_client()
+
+
+@pytest.fixture
+def sprite(client):
+    """URLs of a registered character's sprites."""
+    return client.post("/api/sprite", json=CHARACTER).get_json()
+
+
+def test_register_sprite_returns_versioned_urls(sprite):
+    version = f"/api/sprite/{web_app.SPRITE_VERSION}/{sprite['digest']}/"
+
+    assert sprite["success"]
+    assert sprite["frames"] == [f"{version}{frame}.png" for frame in range(3)]
+    assert sprite["strip"] == f"{version}strip.png"
+
+
+@pytest.mark.parametrize("which", ["frame", "strip"])
+def test_sprite_is_cacheable_png(client, sprite, which):
+    url = sprite["frames"][1] if which == "frame" else sprite["strip"]
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.data.startswith(b"\x89PNG")
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.headers["ETag"] == f'"{etag}"'
+    cache_control = response.headers["Cache-Control"]
+    assert cache_control.startswith("public, max-age=")
+    assert "immutable" in cache_control
+
+
+def test_matching_etag_is_not_modified(client, sprite):
+    etag = client.get(sprite["frames"][0]).headers["ETag"]
+
+    response = client.get(sprite["frames"][0],
+                          headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_unknown_digest_is_not_found(client):
+    response = client.get(f"/api/sprite/{web_app.SPRITE_VERSION}/"
+                          f"{'0' * 40}/0.png")
+
+    assert response.status_code == 404
+    assert not response.get_json()["success"]
+
+
+def test_frame_out_of_range_is_not_found(client, sprite):
+    url = sprite["frames"][0].replace("/0.png", "/3.png")
+
+    response = client.get(url)
+
+    assert response.status_code == 404
+    assert "out of range" in response.get_json()["error"]
+
+
+def test_metrics_endpoint_is_prometheus_text(client):
+    client.post("/api/generate", json=CHARACTER)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith(
+        "text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert "sgdk_render_pool_workers" in text
+    assert "sgdk_export_pool_workers" in text
+
+
+def test_animation_strip_holds_every_frame(client):
+    response = client.post("/api/animation", json=CHARACTER).get_json()
+
+    assert response["success"]
+    assert response["format"] == "strip"
+    assert response["frame_count"] == 3
+    assert (response["frame_width"], response["frame_height"]) == (24, 24)
+    assert _data_url_image(response["image"]).size == (24 * 3, 24)
+
+
+def test_animation_apng_has_every_frame(client):
+    response = client.post("/api/animation",
+                           json={**CHARACTER, "format": "apng"}).get_json()
+
+    assert response["success"]
+    image = _data_url_image(response["image"])
+    assert image.format == "PNG"
+    assert image.n_frames == CHARACTER["animation_frames"]
+    assert image.size == (24, 24)
+
+
+def test_animation_rejects_unknown_format(client):
+    response = client.post("/api/animation",
+                           json={**CHARACTER, "format": "gif"})
+
+    assert response.status_code == 200
+    assert not response.get_json()["success"]
+    assert "gif" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("output_format", ["c", "binary"])
+def test_export_sanitises_name(client, output_format):
+    response = client.post("/api/export", json={
+        **CHARACTER, "name": "../x y", "output_format": output_format,
+    }).get_json()
+
+    assert response["success"]
+    files = response["files"]
+    if output_format == "binary":
+        assert sorted(files["bin_files"]) == [
+            f"___x_y_frame{frame}_data.bin" for frame in range(3)
+        ] + ["___x_y_palette.bin"]
+        assert 'BIN ___x_y_palette "___x_y_palette.bin"' in files["res_file"]
+        sources = [files["res_file"]]
+    else:
+        assert "#ifndef ___X_Y_H" in files["h_file"]
+        assert "const u16 ___x_y_palette[16]" in files["c_file"]
+        sources = [files["c_file"], files["h_file"]]
+    for source in sources:
+        assert "x y" not in source and "../" not in source
+    assert _data_url_image(files["png_file"]).size == (24 * 3, 24)
@@ -1,13 +1,24 @@
 """Web-based SGDK Character Creator."""
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, g, Response
+import argparse
 import os
 import json
 import base64
 import io
+import time
 from PIL import Image
+from app.core.cache import FrameCache
+from app.core.csource import c_name
 from app.core.generator import CharacterGenerator
 from app.core.exporter import SGDKExporter
+from app.core.metrics import metrics
+from app.core.preview import (ENCODING_INDEXED_PNG, ENCODING_RGBA_PNG,
+                              encode_png, encode_preview, render_preview,
+                              render_preview_strip)
+from app.core.render_pool import RenderPool, RenderPoolBusy
+from app.core.singleflight import SingleFlight
+from app.core.spec import CharacterSpec
 
 app = Flask(__name__)
 app.secret_key = 'sgdk_character_creator_secret'
@@ -16,10 +27,142 @@ app.secret_key = 'sgdk_character_creator_secret'
 generator = CharacterGenerator()
 exporter = SGDKExporter()
 
-# Create output directory
-os.makedirs('static/output', exist_ok=True)
+# Rendering runs on a bounded pool so request threads never oversubscribe
+# the CPU; when its queue is full requests get 503 instead of waiting
+render_pool = RenderPool(
+    workers=int(os.environ.get('SGDK_RENDER_WORKERS', 0)) or None,
+    max_pending=int(os.environ.get('SGDK_RENDER_QUEUE', 32)))
+
+# Full exports are slow, so they get a smaller pool of their own and a
+# burst of them is refused there instead of starving interactive previews
+export_pool = RenderPool(
+    workers=(int(os.environ.get('SGDK_EXPORT_WORKERS', 0))
+             or max(1, (os.cpu_count() or 1) // 4)),
+    max_pending=int(os.environ.get('SGDK_EXPORT_QUEUE', 4)))
+
+# Identical previews requested while one is rendering share that render
+preview_flight = SingleFlight()
+
+# Specs registered by POST /api/sprite, looked up by digest when their
+# sprite URLs are fetched; least recently used specs are forgotten
+spec_registry = FrameCache(
+    max_entries=int(os.environ.get('SGDK_SPEC_REGISTRY', 4096)))
+
+# Sprite URLs name their content (renderer version, spec digest and
+# frame), so responses never change and may be cached forever
+SPRITE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Version of the sprite renderer and PNG encoding in sprite URLs and
+# ETags; bump it whenever either changes, so cached sprites go stale
+SPRITE_VERSION = 'v1'
+
+# Stage timings feed /metrics; set SGDK_METRICS=0 to turn them off
+metrics.enabled = os.environ.get('SGDK_METRICS', '1') != '0'
+
 os.makedirs('templates', exist_ok=True)
 
+def _png_data_url(image, **save_params):
+    """Encode an image as a base64 PNG data URL."""
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format='PNG', **save_params)
+    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
+    return f'data:image/png;base64,{img_base64}'
+
+def _render_preview(data, frame, encoding):
+    """Render and encode one frame (runs on the render pool)."""
+    if encoding == ENCODING_RGBA_PNG:
+        image = generator.generate_character(data, frame)
+    else:
+        image = render_preview(generator, data, frame)
+    return encode_preview(image, encoding)
+
+def _render_animation(data, output_format):
+    """Render every frame as a strip or APNG (runs on the render pool)."""
+    if output_format == 'strip':
+        strip = render_preview_strip(generator, data)
+        frame_count = max(1, data.get('animation_frames', 1))
+        return (encode_preview(strip, ENCODING_INDEXED_PNG), frame_count,
+                (strip.width // frame_count, strip.height))
+    
+    frames = generator.generate_animation(data)
+    
+    if output_format == 'apng':
+        image = _png_data_url(frames[0], save_all=True,
+                              append_images=frames[1:],
+                              duration=200, loop=0)
+    else:
+        raise ValueError(f"Unsupported animation format: {output_format}")
+    
+    return image, len(frames), frames[0].size
+
+def _render_sprite_png(data, frame):
+    """Render one frame, or the whole strip for frame None, as PNG."""
+    if frame is None:
+        return encode_png(render_preview_strip(generator, data))
+    return encode_png(render_preview(generator, data, frame))
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started for the latency histogram."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Count the request and record its latency."""
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.increment('sgdk_http_requests_total', endpoint=endpoint,
+                      method=request.method, status=response.status_code)
+    metrics.observe(f'web.{endpoint}',
+                    time.perf_counter() - g.request_started)
+    return response
+
+@app.errorhandler(RenderPoolBusy)
+def render_pool_busy(e):
+    """Ask the client to retry when the render queue is full."""
+    metrics.increment('sgdk_render_rejected_total')
+    response = jsonify({
+        'success': False,
+        'error': 'Server busy, please retry'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose stage timings, request counts and cache stats to Prometheus."""
+    samples = []
+    for cache_name, stats in (
+            ('preview_frame', generator.cache_stats()),
+            ('preview_role', generator.role_cache_stats()),
+            ('export_frame', exporter.generator.cache_stats()),
+            ('export_role', exporter.generator.role_cache_stats())):
+        prefix = f'sgdk_{cache_name}_cache'
+        samples.extend([
+            (f'{prefix}_entries', 'gauge', stats['entries']),
+            (f'{prefix}_max_entries', 'gauge', stats['max_entries']),
+            (f'{prefix}_hits_total', 'counter', stats['hits']),
+            (f'{prefix}_misses_total', 'counter', stats['misses']),
+            (f'{prefix}_evictions_total', 'counter', stats['evictions']),
+        ])
+    flight_stats = preview_flight.stats()
+    samples.extend([
+        ('sgdk_preview_renders_total', 'counter', flight_stats['calls']),
+        ('sgdk_preview_coalesced_total', 'counter',
+         flight_stats['coalesced']),
+    ])
+    for pool_name, pool in (('render', render_pool), ('export', export_pool)):
+        pool_stats = pool.stats()
+        samples.extend([
+            (f'sgdk_{pool_name}_pool_workers', 'gauge', pool_stats['workers']),
+            (f'sgdk_{pool_name}_pool_max_pending', 'gauge',
+             pool_stats['max_pending']),
+            (f'sgdk_{pool_name}_pool_pending', 'gauge', pool_stats['pending']),
+        ])
+    
+    return Response(metrics.render_prometheus(samples),
+                    mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     """Main character creator page."""
@@ -27,24 +170,63 @@ def index():
 
 @app.route('/api/generate', methods=['POST'])
 def generate_character():
-    """Generate character sprite based on parameters."""
+    """Generate character sprite based on parameters.
+    
+    ``encoding`` selects the preview representation: ``"indexed"`` (a
+    4bpp palette PNG data URL, the default), ``"png"`` (the original
+    RGBA PNG data URL) or ``"raw"`` (4bpp pixels plus palette for the
+    browser to expand onto a canvas).
+    """
     try:
         data = request.json
+        spec = CharacterSpec.from_dict(data)
         frame = data.get('frame', 0)
+        encoding = data.get('encoding', ENCODING_INDEXED_PNG)
         
-        # Generate character
-        sprite = generator.generate_character(data, frame)
+        # Generate character and encode it for web display
+        key = ('generate', spec.digest, frame, encoding)
+        image = preview_flight.do(key, render_pool.run, _render_preview,
+                                  spec, frame, encoding)
         
-        # Convert to base64 for web display
-        img_buffer = io.BytesIO()
-        sprite.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
+        return jsonify({
+            'success': True,
+            'encoding': encoding,
+            'image': image
+        })
+    except RenderPoolBusy:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/animation', methods=['POST'])
+def generate_animation():
+    """Render every animation frame of a character in one request.
+    
+    Returns a horizontal sprite strip by default, or an animated PNG when
+    ``format`` is ``"apng"``, so the browser can animate locally.
+    """
+    try:
+        data = request.json
+        spec = CharacterSpec.from_dict(data)
+        output_format = data.get('format', 'strip')
+        
+        key = ('animation', spec.digest, output_format)
+        image, frame_count, (width, height) = preview_flight.do(
+            key, render_pool.run, _render_animation, spec, output_format)
         
         return jsonify({
             'success': True,
-            'image': f'data:image/png;base64,{img_base64}'
+            'format': output_format,
+            'image': image,
+            'frame_count': frame_count,
+            'frame_width': width,
+            'frame_height': height
         })
+    except RenderPoolBusy:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -56,36 +238,75 @@ def export_character():
     """Export character to SGDK format."""
     try:
         data = request.json
-        character_name = data.get('name', 'character')
-        
-        # Create output files
-        output_path = f'static/output/{character_name}.c'
-        exporter.export_character(data, output_path)
-        
-        # Read generated files
-        files = {}
+        # The name becomes C identifiers, include guards and file names
+        character_name = c_name(data.get('name', 'character'))
         
-        # C file
-        if os.path.exists(output_path):
-            with open(output_path, 'r') as f:
-                files['c_file'] = f.read()
+        # Build all outputs in memory; nothing is written to disk, so
+        # concurrent exports with the same name cannot clobber each other
+        layout = data.get('layout', 'linear')
+        dedupe_tiles = bool(data.get('dedupe_tiles', False))
+        compression = data.get('compression')
+        output_format = data.get('output_format', 'c')
+        exported = export_pool.run(exporter.export_to_memory,
+                                   CharacterSpec.from_dict(data),
+                                   character_name, layout, dedupe_tiles,
+                                   compression, output_format)
         
-        # Header file
-        header_path = f'static/output/{character_name}.h'
-        if os.path.exists(header_path):
-            with open(header_path, 'r') as f:
-                files['h_file'] = f.read()
+        if output_format == 'binary':
+            files = {
+                'res_file': exported['res_file'],
+                'bin_files': {
+                    file_name: base64.b64encode(content).decode()
+                    for file_name, content in exported['bin_files'].items()
+                }
+            }
+        else:
+            files = {
+                'c_file': exported['c_file'],
+                'h_file': exported['h_file']
+            }
         
         # PNG file (as base64)
-        png_path = f'static/output/{character_name}.png'
-        if os.path.exists(png_path):
-            with open(png_path, 'rb') as f:
-                png_base64 = base64.b64encode(f.read()).decode()
-                files['png_file'] = f'data:image/png;base64,{png_base64}'
+        if exported['png_file']:
+            png_base64 = base64.b64encode(exported['png_file']).decode()
+            files['png_file'] = f'data:image/png;base64,{png_base64}'
+        
+        return jsonify({
+            'success': True,
+            'files': files,
+            'stats': exported['stats']
+        })
+    except RenderPoolBusy:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/sprite', methods=['POST'])
+def register_sprite():
+    """Register a character and return the cacheable URLs of its sprites.
+    
+    Nothing is rendered here; the URLs render on first fetch and are
+    then served from browser and proxy caches.
+    """
+    try:
+        spec = CharacterSpec.from_dict(request.json)
+        digest = spec.digest
+        spec_registry.put(digest, spec)
+        frame_count = spec.animation_frames
+        size = spec.size
         
         return jsonify({
             'success': True,
-            'files': files
+            'digest': digest,
+            'frame_count': frame_count,
+            'frame_width': size,
+            'frame_height': size,
+            'frames': [f'/api/sprite/{SPRITE_VERSION}/{digest}/{frame}.png'
+                       for frame in range(frame_count)],
+            'strip': f'/api/sprite/{SPRITE_VERSION}/{digest}/strip.png'
         })
     except Exception as e:
         return jsonify({
@@ -93,6 +314,45 @@ def export_character():
             'error': str(e)
         })
 
+@app.route(f'/api/sprite/{SPRITE_VERSION}/<digest>/<int:frame>.png')
+def sprite_frame(digest, frame):
+    """Serve one animation frame of a registered character as PNG."""
+    return _sprite_response(digest, frame)
+
+@app.route(f'/api/sprite/{SPRITE_VERSION}/<digest>/strip.png')
+def sprite_strip(digest):
+    """Serve every frame of a registered character as a horizontal strip."""
+    return _sprite_response(digest, None)
+
+def _sprite_response(digest, frame):
+    """Build a cacheable PNG response, or 304 when the client has it."""
+    etag = f'{SPRITE_VERSION}-{digest}-{"strip" if frame is None else frame}'
+    
+    # The URL fully determines the image, so a matching ETag needs no
+    # registry lookup or render
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        spec = spec_registry.get(digest)
+        if spec is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown sprite; register it with POST /api/sprite'
+            }), 404
+        if frame is not None and frame >= spec.animation_frames:
+            return jsonify({
+                'success': False,
+                'error': f'Frame {frame} out of range'
+            }), 404
+        
+        png = preview_flight.do(('sprite', digest, frame), render_pool.run,
+                                _render_sprite_png, spec, frame)
+        response = Response(png, mimetype='image/png')
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = SPRITE_CACHE_CONTROL
+    return response
+
 @app.route('/api/random', methods=['GET'])
 def random_character():
     """Generate random character parameters."""
@@ -121,5 +381,47 @@ def random_character():
     
     return jsonify(character_data)
 
+def serve(host, port, threads):
+    """Serve the app with a multi-threaded production WSGI server.
+    
+    Uses waitress when it is installed, otherwise the standard library's
+    wsgiref server with one thread per connection.
+    """
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        waitress_serve = None
+    
+    if waitress_serve is not None:
+        waitress_serve(app, host=host, port=port, threads=threads)
+        return
+    
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIServer, make_server
+    
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+    
+    with make_server(host, port, app,
+                     server_class=ThreadingWSGIServer) as httpd:
+        print(f'Serving on http://{host}:{port}')
+        httpd.serve_forever()
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description='SGDK Character Creator')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=12000)
+    parser.add_argument('--threads', type=int, default=16,
+                        help='request threads of the production server')
+    parser.add_argument('--debug', action='store_true',
+                        help="run Flask's development server with the "
+                             'debugger and reloader')
+    return parser.parse_args(argv)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=12000, debug=True)
\ No newline at end of file
+    args = parse_args()
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        serve(args.host, args.port, args.threads)
\ No newline at end of file